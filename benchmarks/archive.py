@@ -0,0 +1,77 @@
+"""Load payload capture archives and replay them in place of the cloud API.
+
+Used by the offline tools in this directory; the integration itself only
+writes archives (see custom_components/cloud_inverter/capture.py).
+"""
+from __future__ import annotations
+
+import glob
+import gzip
+import json
+import os
+import sys
+from collections.abc import Callable
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from custom_components.cloud_inverter.capture import ARCHIVE_NAME  # noqa: E402
+from custom_components.cloud_inverter.const import ENDPOINT_NAME_INVERTER_DETAIL  # noqa: E402
+
+
+def load_archive(path: str) -> list[dict[str, Any]]:
+    """Load captured records from an archive file or capture directory, oldest first."""
+    if os.path.isdir(path):
+        base = os.path.join(path, ARCHIVE_NAME)
+        rotated = sorted(
+            glob.glob(f"{glob.escape(base)}.*"),
+            key=lambda name: int(name.rsplit(".", 1)[1]),
+            reverse=True,
+        )
+        files = rotated + ([base] if os.path.exists(base) else [])
+    else:
+        files = [path]
+
+    records = []
+    for name in files:
+        with gzip.open(name, "rt", encoding="utf-8") as file:
+            records.extend(json.loads(line) for line in file if line.strip())
+    return records
+
+
+class ReplayAPI:
+    """Stand-in for CloudInverterAPI that serves captured responses."""
+
+    def __init__(self, records: list[dict[str, Any]], loop: bool = True) -> None:
+        """Initialize the replay."""
+        self.username = "replay"
+        self.capture: Callable[[str, dict[str, Any]], None] | None = None
+        self._payloads = [
+            record["payload"]
+            for record in records
+            if record.get("endpoint") == ENDPOINT_NAME_INVERTER_DETAIL
+        ]
+        self._loop = loop
+        self._position = 0
+        self.goods_id = next(
+            (payload.get("GoodsID") for payload in self._payloads if payload.get("GoodsID")),
+            None,
+        )
+
+    def __len__(self) -> int:
+        """Return the number of replayable responses."""
+        return len(self._payloads)
+
+    async def get_inverter_data(self, goods_id: str = None) -> dict[str, Any]:
+        """Return the next captured inverter response."""
+        if self._position >= len(self._payloads):
+            if not self._loop or not self._payloads:
+                return {}
+            self._position = 0
+        payload = self._payloads[self._position]
+        self._position += 1
+        return payload
+
+    async def close(self):
+        """Nothing to close."""
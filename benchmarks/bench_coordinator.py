@@ -0,0 +1,393 @@
+"""Microbenchmarks for the Cloud Inverter coordinator hot path.
+
+Measures the pure-CPU stages of a poll for several payload sizes:
+
+- flatten: CloudInverterDataUpdateCoordinator._async_update_data
+- native_value: CloudInverterSensor.native_value for every sensor
+- device_info: CloudInverterSensor.device_info for every sensor
+- state_write: CloudInverterSensor._handle_coordinator_update for every
+  sensor, i.e. the deadband check and the real entity state write
+- state_write_deadband: the same with power, voltage and current deadbands set
+
+Each stage reports the median time per iteration and the memory allocated
+during one iteration. Results are compared against a stored baseline and
+the run fails when a stage regresses past the threshold, or when there is
+no baseline to compare against (unless --allow-missing-baseline is given,
+e.g. on CI runs that only check the benchmarks still work).
+
+Redacted capture archives (capture.jsonl.gz files from the capture option)
+placed in benchmarks/payloads/ are added as scenarios automatically.
+
+Requires Home Assistant to be installed. Usage:
+
+    python benchmarks/bench_coordinator.py                    # compare with baseline
+    python benchmarks/bench_coordinator.py --update-baseline  # store a new baseline
+    python benchmarks/bench_coordinator.py --allow-missing-baseline  # CI without a baseline
+    python benchmarks/bench_coordinator.py --archive config/cloud_inverter_capture/<entry id>
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import glob
+import itertools
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from homeassistant.components.sensor import SensorDeviceClass  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.helpers import (  # noqa: E402
+    device_registry as dr,
+    entity_registry as er,
+)
+from homeassistant.helpers.entity_platform import EntityPlatform  # noqa: E402
+
+from archive import ReplayAPI, load_archive  # noqa: E402
+from custom_components.cloud_inverter.const import (  # noqa: E402
+    DOMAIN,
+    ENDPOINT_NAME_INVERTER_DETAIL,
+    UPDATE_INTERVAL,
+)
+from custom_components.cloud_inverter.sensor import (  # noqa: E402
+    SENSOR_GROUPS,
+    CloudInverterDataUpdateCoordinator,
+    CloudInverterSensor,
+    _string_analysis_sensors,
+    _string_sensors,
+)
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Stages shorter than this are too noisy to gate on
+MIN_GATED_TIME_MS = 0.05
+# Allocation changes smaller than this (in KiB) are not regressions
+MIN_GATED_ALLOC_KB = 1.0
+# Deadbands used by the state_write_deadband stage
+DEADBANDS = {
+    SensorDeviceClass.POWER: 20.0,
+    SensorDeviceClass.VOLTAGE: 1.0,
+    SensorDeviceClass.CURRENT: 0.1,
+}
+
+
+def _load_payload(name: str) -> dict[str, Any]:
+    """Load a recorded payload."""
+    with open(os.path.join(PAYLOAD_DIR, name), encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _jitter(payload: dict[str, Any], rng: random.Random) -> dict[str, Any]:
+    """Return a copy of a payload with numeric values varied by up to 5%."""
+
+    def vary(value: Any) -> Any:
+        if isinstance(value, list):
+            return [vary(item) for item in value]
+        if isinstance(value, dict):
+            return {key: vary(item) for key, item in value.items()}
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return value
+        return f"{number * rng.uniform(0.95, 1.05):.2f}"
+
+    return {key: value if key == "GoodsID" else vary(value) for key, value in payload.items()}
+
+
+def _with_strings(payload: dict[str, Any], count: int) -> dict[str, Any]:
+    """Return a copy of a payload with `count` MPPT strings."""
+    payload = copy.deepcopy(payload)
+    data = payload["data"]
+    for key in ("Pdc", "Vdc", "Idc"):
+        values = data[key]
+        data[key] = [values[index % len(values)] for index in range(count)]
+    return payload
+
+
+def _with_unmapped(payload: dict[str, Any], count: int) -> dict[str, Any]:
+    """Return a copy of a payload with `count` top-level fields no sensor uses.
+
+    Real payloads carry many more fields than the sensors map; these cost
+    fingerprinting on every poll even though they are never copied.
+    """
+    payload = copy.deepcopy(payload)
+    for index in range(count):
+        if index % 10 == 0:
+            payload[f"unmapped{index}"] = {"Status": "1", "Version": f"V1.{index}"}
+        elif index % 3 == 0:
+            payload[f"unmapped{index}"] = f"{index}.5"
+        else:
+            payload[f"unmapped{index}"] = [f"{index}.5"]
+    return payload
+
+
+def build_scenarios(archive: str | None) -> dict[str, list[list[dict[str, Any]]]]:
+    """Return scenarios as a list of inverters, each with its sequence of payloads."""
+    rng = random.Random(1)
+    single = _load_payload("single_inverter.json")
+    large = _with_strings(single, 8)
+    large["modelName"] = "SM-CI-50KW"
+
+    fleet = []
+    for index in range(500):
+        payload = _jitter(single, rng)
+        payload["GoodsID"] = f"2409-{44470000 + index}PH"
+        fleet.append([payload])
+
+    unmapped = _with_unmapped(single, 120)
+
+    scenarios = {
+        "single_inverter": [[_jitter(single, rng) for _ in range(20)]],
+        "unmapped_fields": [[_jitter(unmapped, rng) for _ in range(20)]],
+        "ci_8_mppt": [[_jitter(large, rng) for _ in range(20)]],
+        "fleet_500": fleet,
+    }
+    archives = {
+        os.path.basename(path).split(".", 1)[0]: path
+        for path in sorted(glob.glob(os.path.join(PAYLOAD_DIR, "*.jsonl.gz")))
+    }
+    if archive:
+        archives["archive"] = archive
+    for name, path in archives.items():
+        records = [
+            record
+            for record in load_archive(path)
+            if record.get("endpoint") == ENDPOINT_NAME_INVERTER_DETAIL
+        ]
+        if records:
+            scenarios[name] = [[record["payload"] for record in records]]
+    return scenarios
+
+
+async def _measure(
+    func: Callable[[], Awaitable[None]], repeat: int
+) -> dict[str, float]:
+    """Time a stage and measure what one iteration allocates."""
+    await func()  # warm up
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    await func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "time_ms": round(statistics.median(timings) * 1000, 4),
+        "alloc_kb": round(max(peak - before, 0) / 1024, 2),
+    }
+
+
+class _PayloadAPI(ReplayAPI):
+    """Replay payloads directly instead of capture records."""
+
+    def __init__(self, payloads: list[dict[str, Any]]) -> None:
+        """Initialize the replay."""
+        super().__init__(
+            [{"endpoint": ENDPOINT_NAME_INVERTER_DETAIL, "payload": payload} for payload in payloads]
+        )
+
+
+async def _create_hass(config_dir: str) -> HomeAssistant:
+    """Create a minimal Home Assistant instance."""
+    try:
+        hass = HomeAssistant(config_dir)
+    except TypeError:
+        # Older releases take no arguments
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+    # Entity platforms need the registries
+    await dr.async_load(hass)
+    await er.async_load(hass)
+    return hass
+
+
+async def run_scenario(
+    hass: HomeAssistant, inverters: list[list[dict[str, Any]]], repeat: int
+) -> dict[str, dict[str, float]]:
+    """Run all stages for one scenario."""
+    coordinators = []
+    for payloads in inverters:
+        coordinators.append(CloudInverterDataUpdateCoordinator(hass, _PayloadAPI(payloads)))
+
+    async def flatten() -> None:
+        for coordinator in coordinators:
+            coordinator.data = await coordinator._async_update_data()
+
+    # Record a few snapshots per inverter, so state writes see changing values
+    snapshots = []
+    for coordinator in coordinators:
+        polls = []
+        for _ in range(min(len(coordinator.api), 10)):
+            polls.append(await coordinator._async_update_data())
+        coordinator.data = polls[-1]
+        snapshots.append(polls)
+
+    # Create the sensors once data (and the string count) is known
+    sensors: list[CloudInverterSensor] = []
+    for number, coordinator in enumerate(coordinators):
+        coordinator_sensors = [
+            CloudInverterSensor(coordinator, *description)
+            for descriptions in SENSOR_GROUPS.values()
+            for description in descriptions
+        ]
+        for index in range(coordinator.string_count):
+            coordinator_sensors.extend(_string_sensors(coordinator, index))
+            if coordinator.string_count >= 2:
+                coordinator_sensors.extend(_string_analysis_sensors(coordinator, index))
+        for sensor in coordinator_sensors:
+            # Every inverter uses the same unique ids, so skip the entity registry
+            sensor._attr_unique_id = None
+            sensor.entity_id = f"sensor.bench_{number}_{sensor._data_key.lower()}"
+        sensors.extend(coordinator_sensors)
+
+    # Add the sensors through a real entity platform, so state writes take the full path
+    platform = EntityPlatform(
+        hass=hass,
+        logger=logging.getLogger(__name__),
+        domain="sensor",
+        platform_name=DOMAIN,
+        platform=None,
+        scan_interval=timedelta(seconds=UPDATE_INTERVAL),
+        entity_namespace=None,
+    )
+    await platform.async_add_entities(sensors)
+
+    async def native_value() -> None:
+        for sensor in sensors:
+            sensor.native_value
+
+    async def device_info() -> None:
+        for sensor in sensors:
+            sensor.device_info
+
+    poll = itertools.count()
+
+    async def state_write() -> None:
+        index = next(poll)
+        for coordinator, polls in zip(coordinators, snapshots):
+            coordinator.data = polls[index % len(polls)]
+        for sensor in sensors:
+            sensor._handle_coordinator_update()
+
+    results = {
+        "flatten": await _measure(flatten, repeat),
+        "native_value": await _measure(native_value, repeat),
+        "device_info": await _measure(device_info, repeat),
+        "state_write": await _measure(state_write, repeat),
+    }
+    for coordinator in coordinators:
+        coordinator.deadbands = DEADBANDS
+    results["state_write_deadband"] = await _measure(state_write, repeat)
+
+    await platform.async_reset()
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, dict[str, float]]],
+    baseline: dict[str, dict[str, dict[str, float]]],
+    threshold: float,
+) -> list[str]:
+    """Return a description of every stage that regressed past the threshold."""
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, measured in stages.items():
+            reference = baseline.get(scenario, {}).get(stage)
+            if reference is None:
+                continue
+            for metric in ("time_ms", "alloc_kb"):
+                # Short stages are too noisy to gate on, tiny allocation changes don't matter
+                if metric == "time_ms" and reference[metric] < MIN_GATED_TIME_MS:
+                    continue
+                if metric == "alloc_kb" and measured[metric] - reference[metric] <= MIN_GATED_ALLOC_KB:
+                    continue
+                limit = reference[metric] * (1 + threshold)
+                if measured[metric] > limit:
+                    regressions.append(
+                        f"{scenario}/{stage} {metric}: {measured[metric]} "
+                        f"(baseline {reference[metric]}, limit {limit:.2f})"
+                    )
+    return regressions
+
+
+async def async_main(args: argparse.Namespace) -> int:
+    """Run the benchmarks."""
+    scenarios = build_scenarios(args.archive)
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await _create_hass(config_dir)
+        results = {}
+        for name, inverters in scenarios.items():
+            repeat = max(3, args.repeat // len(inverters))
+            results[name] = await run_scenario(hass, inverters, repeat)
+            for stage, measured in results[name].items():
+                print(
+                    f"{name:<16} {stage:<13} {measured['time_ms']:>10.3f} ms "
+                    f"{measured['alloc_kb']:>10.1f} KiB"
+                )
+        await hass.async_stop(force=True)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline to create one")
+        return 0 if args.allow_missing_baseline else 2
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    if regressions := compare(results, baseline, args.threshold):
+        print("Regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("No regressions")
+    return 0
+
+
+def main() -> int:
+    """Parse arguments and run."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="iterations per stage")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="allowed regression (0.25 = 25%%)"
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file")
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="store results as the new baseline"
+    )
+    parser.add_argument(
+        "--allow-missing-baseline",
+        action="store_true",
+        help="succeed without a baseline (only checks that the benchmarks run)",
+    )
+    parser.add_argument("--archive", help="capture archive to add as a scenario")
+    return asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Replay a payload capture archive through the Cloud Inverter coordinator.
+
+Runs every captured InverterDetailInfoNewone response through
+CloudInverterDataUpdateCoordinator in a throwaway Home Assistant instance,
+so field issues can be reproduced and pipeline throughput measured without
+the cloud. Nothing is written to a real installation: there are no
+entities, no recorder or long-term statistics, no exporter, and events only
+reach the throwaway event bus, where they are printed.
+
+Requires Home Assistant to be installed. Usage:
+
+    python benchmarks/replay.py config/cloud_inverter_capture/<entry id>
+    python benchmarks/replay.py capture.jsonl.gz --fields Pac SOC house_consumption
+    python benchmarks/replay.py capture.jsonl.gz --speed 10   # 10x faster than live
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from homeassistant.core import Event  # noqa: E402
+from homeassistant.helpers import issue_registry as ir  # noqa: E402
+
+from bench_coordinator import _create_hass  # noqa: E402
+from archive import ReplayAPI, load_archive  # noqa: E402
+from custom_components.cloud_inverter.const import (  # noqa: E402
+    ENDPOINT_NAME_INVERTER_DETAIL,
+    EVENT_CLOUD_INVERTER,
+    UPDATE_INTERVAL,
+)
+from custom_components.cloud_inverter.sensor import (  # noqa: E402
+    CloudInverterDataUpdateCoordinator,
+)
+
+
+async def async_main(args: argparse.Namespace) -> int:
+    """Replay the archive."""
+    api = ReplayAPI(load_archive(args.archive), loop=False)
+    if not len(api):
+        print(f"No {ENDPOINT_NAME_INVERTER_DETAIL} responses found in {args.archive}")
+        return 1
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await _create_hass(config_dir)
+        # Repair issues raised while replaying stay in the throwaway instance
+        await ir.async_load(hass)
+
+        def _print_event(event: Event) -> None:
+            print(f"event {event.data}")
+
+        hass.bus.async_listen(EVENT_CLOUD_INVERTER, _print_event)
+        coordinator = CloudInverterDataUpdateCoordinator(hass, api)
+        interval = UPDATE_INTERVAL / args.speed if args.speed else 0
+
+        polls = 0
+        elapsed = 0.0
+        while True:
+            start = time.perf_counter()
+            data = await coordinator._async_update_data()
+            elapsed += time.perf_counter() - start
+            if not data:
+                break
+            polls += 1
+            if args.fields:
+                print(f"{polls:>6} " + " ".join(f"{key}={data.get(key)}" for key in args.fields))
+            await hass.async_block_till_done()
+            if interval:
+                await asyncio.sleep(interval)
+
+        await hass.async_stop(force=True)
+
+    print(
+        f"Replayed {polls} payloads in {elapsed * 1000:.1f} ms "
+        f"({elapsed * 1e6 / polls:.1f} µs per poll)"
+    )
+    return 0
+
+
+def main() -> int:
+    """Parse arguments and run."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("archive", help="capture directory or archive file")
+    parser.add_argument("--fields", nargs="+", help="flattened fields to print for every poll")
+    parser.add_argument(
+        "--speed", type=float, default=0, help="speed-up over live polling (0 = as fast as possible)"
+    )
+    return asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,8 @@ from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 
 from .const import DOMAIN, CONF_GOODS_ID
+from .refresh import async_setup_services, async_unload_services
+from .websocket_api import async_register_websocket_commands
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,6 +33,11 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     )
     
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    await async_setup_services(hass)
+    async_register_websocket_commands(hass)
+    
+    # Apply option changes live instead of reloading the entry
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     
     return True
 
@@ -38,13 +45,33 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        
+        if coordinator := entry_data.get("coordinator"):
+            # Import any completed hours still held in memory
+            await coordinator.statistics.async_flush()
+            # Flush snapshots still queued for export
+            if coordinator.exporter is not None:
+                await coordinator.exporter.async_stop()
+            # Release the pooled HTTP session and its sockets
+            await coordinator.api.close()
         _LOGGER.info("Unloaded Cloud Inverter integration for inverter: %s", 
                     entry.data.get(CONF_GOODS_ID, "Unknown"))
+        async_unload_services(hass)
     
     return unload_ok
 
 
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running coordinator and sensors."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    if "coordinator" not in entry_data:
+        return
+    await entry_data["coordinator"].async_apply_options(entry)
+    entry_data["sync_sensor_groups"]()
+    _LOGGER.info("Applied new options for inverter: %s", entry.data.get(CONF_GOODS_ID, "Unknown"))
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
     await async_unload_entry(hass, entry)
@@ -1,7 +1,9 @@
 """API Client for Cloud Inverter."""
 import logging
+import ssl
 import aiohttp
 import asyncio
+from collections.abc import Callable
 from typing import Any
 
 from .const import (
@@ -11,6 +13,9 @@ from .const import (
     ENDPOINT_GROUP_LIST,
     ENDPOINT_GROUP_DETAIL,
     ENDPOINT_INVERTER_DETAIL,
+    ENDPOINT_NAME_GROUP_DETAIL,
+    ENDPOINT_NAME_INVERTER_DETAIL,
+    UPDATE_INTERVAL,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -21,31 +26,114 @@ DEFAULT_AUTH_TOKEN = "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9.eyJpc3MiOiJ3d3cuY2xvd
 # Default sign value (you may need to update this if it changes)
 DEFAULT_SIGN = "3kNFdvKEsLcyS6GsYUV/PeMKGj1Lkq05PA81+SG5Dljmx6KBvhhV7DhC8qrIPUX60AqLZQ0t8QbqUhVB9VW5oT+5iNwnvvkzDyqtAq03BKCRctLpzBbfaWlMYhgxCM/m"
 
+# Connection pool settings for the dedicated session
+CONNECTION_LIMIT_PER_HOST = 4
+DNS_CACHE_TTL = 300  # seconds
+# Idle connections are kept open a margin past the poll interval so TLS is
+# reused between polls. Servers drop idle connections after a few minutes
+# anyway, so longer intervals reconnect on every poll.
+KEEPALIVE_MARGIN = 45  # seconds
+MAX_KEEPALIVE_TIMEOUT = 300  # seconds
+DEFAULT_MAX_CONCURRENT_REQUESTS = CONNECTION_LIMIT_PER_HOST
+REQUEST_TIMEOUT = 30  # seconds
+
+
+def keepalive_timeout(interval: float) -> float:
+    """Return how long to keep idle connections open when polling every interval seconds."""
+    return min(interval + KEEPALIVE_MARGIN, MAX_KEEPALIVE_TIMEOUT)
+
+
+KEEPALIVE_TIMEOUT = keepalive_timeout(UPDATE_INTERVAL)
+
+
+def create_session(
+    ssl_context: ssl.SSLContext | bool = True, keepalive: float = KEEPALIVE_TIMEOUT
+) -> aiohttp.ClientSession:
+    """Create a pooled session tuned for polling the Cloud Inverter API."""
+    connector = aiohttp.TCPConnector(
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=keepalive,
+        ssl=ssl_context,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={"Accept-Encoding": "gzip, deflate"},
+    )
+
 
 class CloudInverterAPI:
     """Class to communicate with Cloud Inverter API."""
 
-    def __init__(self, username: str, password: str, session: aiohttp.ClientSession = None):
-        """Initialize the API client."""
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        session: aiohttp.ClientSession = None,
+        ssl_context: ssl.SSLContext | bool = True,
+    ):
+        """Initialize the API client.
+
+        Without a session, a dedicated pooled session is created on first use
+        and owned by this client until close() is called.
+        """
         self.username = username
         self.password = password
         self.session = session
+        self._ssl_context = ssl_context
+        self._slots = asyncio.Semaphore(DEFAULT_MAX_CONCURRENT_REQUESTS)
+        self._keepalive = KEEPALIVE_TIMEOUT
+        self._retiring: set[asyncio.Task] = set()
         self.token = None
         self.member_auto_id = None
         self.goods_id = None
         self._close_session = False
+        # Optional hook receiving (endpoint name, raw response) for capture
+        self.capture: Callable[[str, dict[str, Any]], None] | None = None
 
     async def _get_session(self) -> aiohttp.ClientSession:
         """Get aiohttp session."""
         if self.session is None:
-            self.session = aiohttp.ClientSession()
+            self.session = create_session(self._ssl_context, self._keepalive)
             self._close_session = True
         return self.session
 
+    def set_max_concurrent_requests(self, limit: int) -> None:
+        """Limit how many requests this client runs at the same time."""
+        # Requests holding a slot of the old semaphore finish normally. Options
+        # saved before the range was capped may exceed the connection pool.
+        self._slots = asyncio.Semaphore(max(1, min(limit, CONNECTION_LIMIT_PER_HOST)))
+
+    def set_keepalive_timeout(self, timeout: float) -> None:
+        """Keep idle pooled connections open for timeout seconds."""
+        if timeout == self._keepalive:
+            return
+        self._keepalive = timeout
+        if self._close_session and self.session:
+            # The connector fixes its keep-alive when created, so later requests
+            # get a new session and the old one closes after its requests
+            task = asyncio.get_running_loop().create_task(self._async_retire(self.session))
+            self._retiring.add(task)
+            task.add_done_callback(self._retiring.discard)
+            self.session = None
+            self._close_session = False
+
+    async def _async_retire(self, session: aiohttp.ClientSession) -> None:
+        """Close a replaced session once its in-flight requests have timed out at the latest."""
+        try:
+            await asyncio.sleep(REQUEST_TIMEOUT)
+        finally:
+            await session.close()
+
     async def close(self):
-        """Close the session."""
+        """Close the session if this client owns it."""
+        for task in list(self._retiring):
+            task.cancel()
+        await asyncio.gather(*self._retiring, return_exceptions=True)
         if self._close_session and self.session:
             await self.session.close()
+            self.session = None
+            self._close_session = False
 
     async def login(self) -> bool:
         """Login to Cloud Inverter API."""
@@ -66,7 +154,7 @@ class CloudInverterAPI:
                 "authorization": DEFAULT_AUTH_TOKEN
             }
             
-            async with asyncio.timeout(30):
+            async with self._slots, asyncio.timeout(REQUEST_TIMEOUT):
                 async with session.post(ENDPOINT_LOGIN, json=payload, headers=headers) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -110,7 +198,7 @@ class CloudInverterAPI:
                 "cookie": "timezone=Asia%2FKarachi"
             }
             
-            async with asyncio.timeout(30):
+            async with self._slots, asyncio.timeout(REQUEST_TIMEOUT):
                 async with session.post(ENDPOINT_MEMBER_DATA, json=payload, headers=headers) as response:
                     if response.status == 200:
                         return await response.json()
@@ -141,6 +229,7 @@ class CloudInverterAPI:
                 "cookie": "timezone=Asia%2FKarachi"
             }
             
+            # No request slot here: the group detail lookup below takes one
             async with asyncio.timeout(30):
                 async with session.post(ENDPOINT_GROUP_LIST, json=payload, headers=headers) as response:
                     if response.status == 200:
@@ -188,11 +277,13 @@ class CloudInverterAPI:
                 "cookie": "timezone=Asia%2FKarachi"
             }
             
-            async with asyncio.timeout(30):
+            async with self._slots, asyncio.timeout(REQUEST_TIMEOUT):
                 async with session.post(ENDPOINT_GROUP_DETAIL, json=payload, headers=headers) as response:
                     if response.status == 200:
                         data = await response.json()
                         _LOGGER.debug("Group detail response: %s", data)
+                        if self.capture:
+                            self.capture(ENDPOINT_NAME_GROUP_DETAIL, data)
                         
                         inverters = data.get("AllInverterList", [])
                         if inverters and len(inverters) > 0:
@@ -250,7 +341,7 @@ class CloudInverterAPI:
                 "sign": "bA/YbB72GDQL6DmqFtfIYLfV68qsRoH+B7Q2ZhFbiwWqDwO37OAcUqk/RAHWIcG75YQIVk7uvfISm3P0f/V0i6mgF+Dr5/P4eaq6skBL8HQ="
             }
             
-            async with asyncio.timeout(30):
+            async with self._slots, asyncio.timeout(REQUEST_TIMEOUT):
                 async with session.post(ENDPOINT_INVERTER_DETAIL, json=payload, headers=headers) as response:
                     if response.status == 200:
                         response_text = await response.text()
@@ -258,6 +349,8 @@ class CloudInverterAPI:
                         
                         try:
                             data = await response.json() if response_text else {}
+                            if self.capture and data:
+                                self.capture(ENDPOINT_NAME_INVERTER_DETAIL, data)
                             if data and len(data) > 5:  # Should have multiple keys
                                 _LOGGER.info("Successfully retrieved inverter data with %d fields", len(data))
                                 return data
@@ -0,0 +1,112 @@
+"""Battery runtime estimation for Cloud Inverter."""
+from __future__ import annotations
+
+import math
+from typing import Any
+
+from .const import BATTERY_ESTIMATOR_WINDOW, BATTERY_RESERVE_SOC
+from .history import as_float
+
+# Rates below this (in % per hour) are treated as idle
+IDLE_RATE = 0.5
+# PV power (W) below this means the panels have stopped for the day
+PV_OFF_POWER = 10.0
+# Averaging window (in seconds) of the night-time SOC rate used for the sunrise projection
+NIGHT_WINDOW = 3600
+
+
+class BatteryEstimator:
+    """Estimate time-to-full, time-to-empty and SOC at sunrise.
+
+    Keeps exponentially weighted averages of the SOC slope and battery power,
+    so each sample is O(1) in time and memory and no history is queried.
+    The SOC at sunrise is only projected while the PV is off, from a slower
+    average of the night-time rate, since daytime charging says nothing
+    about the night.
+    """
+
+    def __init__(self, window: float = BATTERY_ESTIMATOR_WINDOW) -> None:
+        """Initialize the estimator."""
+        self.window = window
+        self._last_timestamp: float | None = None
+        self._last_soc = math.nan
+        self._soc_slope = math.nan  # % per hour
+        self._power = math.nan  # W, positive when charging
+        self._night_rate = math.nan  # % per hour while the PV is off
+
+    def _smooth(self, average: float, sample: float, alpha: float) -> float:
+        """Fold a sample into an exponentially weighted average."""
+        if math.isnan(average):
+            return sample
+        return average + alpha * (sample - average)
+
+    def update(
+        self, timestamp: float, data: dict[str, Any], sunrise: float | None = None
+    ) -> dict[str, float | None]:
+        """Fold in a snapshot and return the current estimates."""
+        soc = as_float(data.get("SOC"))
+        power = as_float(data.get("battery_power"))
+
+        elapsed = (
+            timestamp - self._last_timestamp if self._last_timestamp is not None else 0.0
+        )
+        if elapsed > 3 * self.window:
+            # Too long since the last sample, start over
+            self._soc_slope = self._power = self._last_soc = math.nan
+            elapsed = 0.0
+
+        # Weight follows the real sample spacing so missed polls don't skew the average
+        alpha = 1 - math.exp(-elapsed / self.window) if elapsed > 0 else 1.0
+
+        if not math.isnan(power):
+            self._power = self._smooth(self._power, power, alpha)
+        if not math.isnan(soc):
+            if elapsed > 0 and not math.isnan(self._last_soc):
+                slope = (soc - self._last_soc) / elapsed * 3600
+                self._soc_slope = self._smooth(self._soc_slope, slope, alpha)
+            self._last_soc = soc
+        self._last_timestamp = timestamp
+
+        rate = self._rate(data, self._power)
+        pv_off = as_float(data.get("Pac")) < PV_OFF_POWER
+        # Fold in the unsmoothed rate, so the evening average doesn't start from daytime charging
+        if pv_off and not math.isnan(sample_rate := self._rate(data, power)):
+            night_alpha = 1 - math.exp(-elapsed / NIGHT_WINDOW) if elapsed > 0 else 1.0
+            self._night_rate = self._smooth(self._night_rate, sample_rate, night_alpha)
+
+        if math.isnan(soc) or math.isnan(rate):
+            return {
+                "battery_time_to_full": None,
+                "battery_time_to_empty": None,
+                "battery_soc_at_sunrise": None,
+            }
+
+        time_to_full = None
+        time_to_empty = None
+        if rate > IDLE_RATE and soc < 100:
+            time_to_full = round((100 - soc) / rate * 60)
+        elif rate < -IDLE_RATE and soc > BATTERY_RESERVE_SOC:
+            time_to_empty = round((soc - BATTERY_RESERVE_SOC) / -rate * 60)
+
+        soc_at_sunrise = None
+        if pv_off and sunrise is not None and sunrise > timestamp:
+            projected = soc + self._night_rate * (sunrise - timestamp) / 3600
+            soc_at_sunrise = round(min(max(projected, BATTERY_RESERVE_SOC), 100.0), 1)
+
+        return {
+            "battery_time_to_full": time_to_full,
+            "battery_time_to_empty": time_to_empty,
+            "battery_soc_at_sunrise": soc_at_sunrise,
+        }
+
+    def _rate(self, data: dict[str, Any], power: float) -> float:
+        """Return the SOC rate of change in % per hour at a battery power.
+
+        Battery power converted through the pack's energy capacity reacts
+        faster than the integer SOC readings, so it is preferred when the
+        capacity and voltage are known.
+        """
+        capacity_wh = as_float(data.get("capacity")) * as_float(data.get("volt"))
+        if not math.isnan(power) and not math.isnan(capacity_wh) and capacity_wh > 0:
+            return power / capacity_wh * 100
+        return self._soc_slope
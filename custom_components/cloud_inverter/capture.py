@@ -0,0 +1,86 @@
+"""Sampled payload capture for Cloud Inverter."""
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import time
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.core import HomeAssistant
+
+from .const import CAPTURE_MAX_BYTES, CAPTURE_MAX_FILES, CAPTURE_SAMPLE_EVERY
+
+_LOGGER = logging.getLogger(__name__)
+
+# Credentials and personal data never written to the archive
+REDACT_KEYS = {
+    "token",
+    "password",
+    "Password",
+    "sign",
+    "authorization",
+    "MemberID",
+    "MemberAutoID",
+    "Email",
+    "email",
+    "Phone",
+    "Mobile",
+    "Address",
+    "Latitude",
+    "Longitude",
+}
+
+ARCHIVE_NAME = "capture.jsonl.gz"
+
+
+class PayloadCapture:
+    """Write a sample of raw API responses to a rotating gzip archive.
+
+    Only one in every `sample_every` responses per endpoint is kept, and the
+    payload is serialized in the executor, so polls that are not sampled
+    cost a counter increment.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, directory: str, sample_every: int = CAPTURE_SAMPLE_EVERY
+    ) -> None:
+        """Initialize the capture."""
+        self.hass = hass
+        self.directory = directory
+        self.sample_every = sample_every
+        self._counters: dict[str, int] = {}
+
+    def __call__(self, endpoint: str, payload: dict[str, Any]) -> None:
+        """Sample a raw response."""
+        count = self._counters.get(endpoint, 0)
+        self._counters[endpoint] = count + 1
+        if count % self.sample_every:
+            return
+        record = {
+            "time": time.time(),
+            "endpoint": endpoint,
+            "payload": async_redact_data(payload, REDACT_KEYS),
+        }
+        self.hass.async_add_executor_job(self._write, record)
+
+    def _write(self, record: dict[str, Any]) -> None:
+        """Append a record to the archive, rotating it when full."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, ARCHIVE_NAME)
+        with gzip.open(path, "at", encoding="utf-8") as file:
+            file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+        if os.path.getsize(path) < CAPTURE_MAX_BYTES:
+            return
+        # capture.jsonl.gz -> capture.jsonl.gz.1 -> ... -> capture.jsonl.gz.N (dropped)
+        for index in range(CAPTURE_MAX_FILES - 1, 0, -1):
+            older = f"{path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{path}.{index + 1}")
+        os.replace(path, f"{path}.1")
+        oldest = f"{path}.{CAPTURE_MAX_FILES}"
+        if os.path.exists(oldest):
+            os.remove(oldest)
@@ -7,12 +7,41 @@ from typing import Any
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+import homeassistant.helpers.config_validation as cv
 
-from .api import CloudInverterAPI
-from .const import DOMAIN, CONF_USERNAME, CONF_PASSWORD
+from .api import (
+    CONNECTION_LIMIT_PER_HOST,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    CloudInverterAPI,
+)
+from .const import (
+    DOMAIN,
+    CONF_USERNAME,
+    CONF_PASSWORD,
+    UPDATE_INTERVAL,
+    CONF_SCAN_INTERVAL,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_SENSOR_GROUPS,
+    CONF_POWER_DEADBAND,
+    CONF_VOLTAGE_DEADBAND,
+    CONF_CURRENT_DEADBAND,
+    CONF_EXPORT_TARGET,
+    CONF_EXPORT_FORMAT,
+    CONF_CAPTURE,
+    CONF_SOC_THRESHOLDS,
+    CONF_SOC_HYSTERESIS,
+    EVENT_SOC_THRESHOLDS,
+    EVENT_SOC_HYSTERESIS,
+    EXPORT_FORMAT_INFLUX,
+    EXPORT_FORMAT_JSON,
+    MIN_SCAN_INTERVAL,
+    MAX_SCAN_INTERVAL,
+    OPTIONAL_SENSOR_GROUPS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,7 +55,9 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
 
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect."""
-    api = CloudInverterAPI(data[CONF_USERNAME], data[CONF_PASSWORD])
+    api = CloudInverterAPI(
+        data[CONF_USERNAME], data[CONF_PASSWORD], async_get_clientsession(hass)
+    )
     
     try:
         if not await api.test_connection():
@@ -58,6 +89,14 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self.api = None
         self.inverters = []
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -198,6 +237,101 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
 
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle runtime options for Cloud Inverter.
+
+    Options are applied live by the running coordinator; the entry is not reloaded.
+    """
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            try:
+                thresholds = _parse_soc_thresholds(user_input.get(CONF_SOC_THRESHOLDS, ""))
+            except ValueError:
+                errors[CONF_SOC_THRESHOLDS] = "invalid_soc_thresholds"
+            else:
+                # Keep options not shown in the form (e.g. exposed fields)
+                options = {**self._entry.options, **user_input, CONF_SOC_THRESHOLDS: thresholds}
+                # An empty export target means export is off
+                if not user_input.get(CONF_EXPORT_TARGET):
+                    options.pop(CONF_EXPORT_TARGET, None)
+                return self.async_create_entry(title="", data=options)
+
+        options = self._entry.options
+        data_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_SCAN_INTERVAL,
+                    default=options.get(CONF_SCAN_INTERVAL, UPDATE_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL, max=MAX_SCAN_INTERVAL)),
+                vol.Required(
+                    CONF_MAX_CONCURRENT_REQUESTS,
+                    default=min(
+                        options.get(CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS),
+                        CONNECTION_LIMIT_PER_HOST,
+                    ),
+                # More requests than pooled connections would only queue in the connector
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=CONNECTION_LIMIT_PER_HOST)),
+                vol.Required(
+                    CONF_SENSOR_GROUPS,
+                    default=options.get(CONF_SENSOR_GROUPS, list(OPTIONAL_SENSOR_GROUPS)),
+                ): cv.multi_select(OPTIONAL_SENSOR_GROUPS),
+                vol.Required(
+                    CONF_POWER_DEADBAND, default=options.get(CONF_POWER_DEADBAND, 0)
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Required(
+                    CONF_VOLTAGE_DEADBAND, default=options.get(CONF_VOLTAGE_DEADBAND, 0)
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Required(
+                    CONF_CURRENT_DEADBAND, default=options.get(CONF_CURRENT_DEADBAND, 0)
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_EXPORT_TARGET,
+                    description={"suggested_value": options.get(CONF_EXPORT_TARGET)},
+                ): str,
+                vol.Required(
+                    CONF_EXPORT_FORMAT,
+                    default=options.get(CONF_EXPORT_FORMAT, EXPORT_FORMAT_INFLUX),
+                ): vol.In([EXPORT_FORMAT_INFLUX, EXPORT_FORMAT_JSON]),
+                vol.Required(
+                    CONF_CAPTURE, default=options.get(CONF_CAPTURE, False)
+                ): bool,
+                vol.Optional(
+                    CONF_SOC_THRESHOLDS,
+                    description={
+                        "suggested_value": ", ".join(
+                            f"{threshold:g}"
+                            for threshold in options.get(CONF_SOC_THRESHOLDS, EVENT_SOC_THRESHOLDS)
+                        )
+                    },
+                ): str,
+                vol.Required(
+                    CONF_SOC_HYSTERESIS,
+                    default=options.get(CONF_SOC_HYSTERESIS, EVENT_SOC_HYSTERESIS),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=20)),
+            }
+        )
+
+        return self.async_show_form(step_id="init", data_schema=data_schema, errors=errors)
+
+
+def _parse_soc_thresholds(value: str) -> list[float]:
+    """Parse a comma separated list of SOC percentages."""
+    thresholds = sorted({float(part) for part in value.split(",") if part.strip()})
+    if any(threshold <= 0 or threshold > 100 for threshold in thresholds):
+        raise ValueError("SOC thresholds must be between 0 and 100")
+    # Whole percentages stay integers in the event data
+    return [int(threshold) if threshold.is_integer() else threshold for threshold in thresholds]
+
+
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
 
@@ -13,6 +13,10 @@ ENDPOINT_GROUP_LIST = f"{API_BASE_URL}/GroupList"
 ENDPOINT_GROUP_DETAIL = f"{API_BASE_URL}/GroupDetailList"
 ENDPOINT_INVERTER_DETAIL = f"{API_BASE_URL}/InverterDetailInfoNewone"
 
+# Endpoint names recorded with captured responses
+ENDPOINT_NAME_GROUP_DETAIL = "GroupDetailList"
+ENDPOINT_NAME_INVERTER_DETAIL = "InverterDetailInfoNewone"
+
 # Configuration
 CONF_USERNAME = "username"
 CONF_PASSWORD = "password"
@@ -98,3 +102,105 @@ SENSOR_SELF_SUFFICIENCY_RATE = "self_sufficiency_rate"
 SENSOR_MODEL = "model"
 SENSOR_SERIAL_NUMBER = "serial_number"
 SENSOR_FIRMWARE_VERSION = "firmware_version"
+
+# Long-term statistics flush interval (in seconds)
+STATISTICS_FLUSH_INTERVAL = 900
+
+# Snapshot history kept in memory (in seconds). A completed hour is imported
+# up to one flush interval after it ends, so keep more than 75 minutes.
+HISTORY_RETENTION = 5400
+HISTORY_MIN_SIZE = 16
+
+# Fields imported as hourly mean/min/max statistics: data key -> (name, unit)
+STATISTICS_MEASUREMENTS = {
+    "Pac": ("PV Power", "W"),
+    "gridCurrpac": ("Grid Power", "W"),
+    "gridVac": ("Grid Voltage", "V"),
+    "battery_power": ("Battery Power", "W"),
+    "volt": ("Battery Voltage", "V"),
+    "SOC": ("Battery SOC", "%"),
+    "epsCurrpac": ("Home Load Power", "W"),
+    "genCurrpac": ("Heavy Load Power", "W"),
+    "loadCurrpac": ("On-Grid Load Power", "W"),
+    "Tntc": ("Inverter Temperature", "°C"),
+}
+
+# Daily counters imported as reset-aware hourly sums: data key -> (name, unit)
+STATISTICS_COUNTERS = {
+    "EToday": ("Daily Energy", "kWh"),
+    "ETDay": ("Grid Export Today", "kWh"),
+    "EFDay": ("Grid Import Today", "kWh"),
+    "batChrg": ("Battery Charge Today", "kWh"),
+    "batDischrg": ("Battery Discharge Today", "kWh"),
+    "EPSDay": ("Home Load Energy Today", "kWh"),
+    "GENDay": ("Heavy Load Energy Today", "kWh"),
+    "ELDay": ("On-Grid Load Energy Today", "kWh"),
+}
+
+# Battery runtime estimator
+BATTERY_ESTIMATOR_WINDOW = 900  # seconds, time constant of the exponential averages
+BATTERY_RESERVE_SOC = 10  # percent, SOC at which the inverter stops discharging
+
+# PV string mismatch analysis
+STRING_MIN_POWER = 0.05  # kW, median string power below which strings are not compared
+STRING_SCORE_ALERT = 25.0  # percent, underperformance score that raises a repair issue
+STRING_SCORE_CLEAR = 15.0  # percent, score at which the issue is cleared again
+
+# Transition events fired on the Home Assistant event bus
+EVENT_CLOUD_INVERTER = f"{DOMAIN}_event"
+EVENT_DEBOUNCE_POLLS = 2  # consecutive polls a new state must persist before firing
+CONF_SOC_THRESHOLDS = "soc_thresholds"
+CONF_SOC_HYSTERESIS = "soc_hysteresis"
+EVENT_SOC_THRESHOLDS = (20, 50, 80, 100)  # percent, default
+EVENT_SOC_HYSTERESIS = 2  # percent, default
+GRID_PRESENT_VOLTAGE = 50  # V, grid voltage below this counts as grid loss
+
+# On-demand refresh service
+SERVICE_REFRESH = "refresh"
+ATTR_ACCOUNT = "account"
+ATTR_PRIORITY = "priority"
+REFRESH_PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+REFRESH_MIN_SPACING = 10  # seconds between on-demand refreshes per account
+REFRESH_BURST = 2  # on-demand refreshes allowed back to back
+
+# Snapshot export (options)
+CONF_EXPORT_TARGET = "export_target"
+CONF_EXPORT_FORMAT = "export_format"
+EXPORT_FORMAT_INFLUX = "influx"
+EXPORT_FORMAT_JSON = "json"
+EXPORT_QUEUE_SIZE = 256  # snapshots buffered in memory
+EXPORT_BATCH_SIZE = 32  # snapshots per write
+EXPORT_FLUSH_INTERVAL = 5  # seconds to wait for more snapshots before writing
+EXPORT_SPILL_MAX_BYTES = 10 * 1024 * 1024  # on-disk spill while the sink is down
+EXPORT_SPILL_CHUNK_BYTES = 256 * 1024  # spill replayed per write once the sink is back
+
+# Payload capture (options)
+CONF_CAPTURE = "capture"
+CAPTURE_SAMPLE_EVERY = 10  # capture one in this many responses per endpoint
+CAPTURE_MAX_BYTES = 5 * 1024 * 1024  # per archive file before rotating
+CAPTURE_MAX_FILES = 5
+
+# Runtime options
+CONF_SCAN_INTERVAL = "scan_interval"
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+CONF_SENSOR_GROUPS = "sensor_groups"
+CONF_POWER_DEADBAND = "power_deadband"
+CONF_VOLTAGE_DEADBAND = "voltage_deadband"
+CONF_CURRENT_DEADBAND = "current_deadband"
+MIN_SCAN_INTERVAL = 10  # seconds
+MAX_SCAN_INTERVAL = 3600  # seconds
+
+# Sensor groups that can be switched off in the options
+OPTIONAL_SENSOR_GROUPS = {
+    "battery": "Battery",
+    "eps": "Home Load (EPS)",
+    "generator": "Heavy Load (Generator)",
+    "on_grid_load": "On-Grid Load",
+    "diagnostics": "Diagnostics and Device Info",
+}
+
+# Payload fields exposed as extra (disabled) sensors after a schema drift
+CONF_EXPOSED_FIELDS = "exposed_fields"
+
+# Dispatcher signal sent with the entry id once an entry's coordinator is ready
+SIGNAL_COORDINATOR_READY = f"{DOMAIN}_coordinator_ready"
@@ -0,0 +1,112 @@
+"""Derived energy balance metrics for Cloud Inverter."""
+from __future__ import annotations
+
+import logging
+import math
+from typing import Any
+
+from .history import as_float
+
+_LOGGER = logging.getLogger(__name__)
+
+# Maximum difference (in percentage points) tolerated against the cloud's own rates
+RATE_TOLERANCE = 5.0
+
+
+def _ratio(numerator: float, denominator: float) -> float | None:
+    """Return numerator / denominator as a clamped percentage."""
+    if math.isnan(numerator) or math.isnan(denominator) or denominator <= 0:
+        return None
+    return round(min(max(numerator / denominator * 100, 0.0), 100.0), 1)
+
+
+def _known_sum(*values: float) -> float:
+    """Return the sum of the known values, treating missing ones as 0.
+
+    NaN only if all of them are missing, e.g. ports an inverter doesn't have.
+    """
+    known = [value for value in values if not math.isnan(value)]
+    return sum(known) if known else math.nan
+
+
+def _value(value: float) -> float | None:
+    """Return a rounded value, or None if unknown."""
+    return None if math.isnan(value) else round(value, 3)
+
+
+class EnergyBalance:
+    """Compute consumption, self-use and efficiency metrics in one pass per snapshot."""
+
+    def __init__(self) -> None:
+        """Initialize the calculator."""
+        self._mismatch: set[str] = set()
+
+    def compute(self, data: dict[str, Any]) -> dict[str, float | None]:
+        """Return derived metrics for a flattened snapshot."""
+        pv = as_float(data.get("Pac"))
+        # Without a battery, charge and discharge are 0
+        battery = _known_sum(as_float(data.get("toPbat")), -as_float(data.get("fromPbat")), 0.0)
+        # Home (EPS), heavy (generator port) and on-grid loads
+        house = _known_sum(
+            as_float(data.get("epsCurrpac")),
+            as_float(data.get("genCurrpac")),
+            as_float(data.get("loadCurrpac")),
+        )
+
+        # Instantaneous balance: whatever PV and the battery don't cover comes from the grid
+        net_grid = house + battery - pv
+        export = max(-net_grid, 0.0) if not math.isnan(net_grid) else math.nan
+
+        # Daily balance from the cloud's counters
+        produced = as_float(data.get("EToday"))
+        exported = as_float(data.get("ETDay"))
+        imported = as_float(data.get("EFDay"))
+        consumed = _known_sum(
+            as_float(data.get("EPSDay")),
+            as_float(data.get("GENDay")),
+            as_float(data.get("ELDay")),
+        )
+
+        derived = {
+            "house_consumption": _value(house),
+            "pv_self_use": _value(pv - export),
+            "net_grid_power": _value(net_grid),
+            "house_consumption_today": _value(consumed),
+            "self_consumption_rate_calculated": _ratio(produced - exported, produced),
+            "self_sufficiency_rate_calculated": _ratio(consumed - imported, consumed),
+            "battery_round_trip_efficiency": _ratio(
+                as_float(data.get("Etotal_batDischrg")),
+                as_float(data.get("Etotal_batChrg")),
+            ),
+        }
+
+        self._cross_check(
+            "self_consumption_rate",
+            derived["self_consumption_rate_calculated"],
+            data.get("Dailyself_userate"),
+        )
+        self._cross_check(
+            "self_sufficiency_rate",
+            derived["self_sufficiency_rate_calculated"],
+            data.get("Dailyself_sufficiencyrate"),
+        )
+        return derived
+
+    def _cross_check(self, name: str, calculated: float | None, reported: Any) -> None:
+        """Log once when a calculated rate drifts away from the cloud's value."""
+        reported = as_float(reported)
+        if calculated is None or math.isnan(reported):
+            return
+
+        if abs(calculated - reported) > RATE_TOLERANCE:
+            if name not in self._mismatch:
+                self._mismatch.add(name)
+                _LOGGER.warning(
+                    "Calculated %s (%.1f%%) differs from the cloud value (%.1f%%)",
+                    name.replace("_", " "),
+                    calculated,
+                    reported,
+                )
+        elif name in self._mismatch:
+            self._mismatch.discard(name)
+            _LOGGER.info("Calculated %s matches the cloud value again", name.replace("_", " "))
@@ -0,0 +1,133 @@
+"""Transition events for Cloud Inverter."""
+from __future__ import annotations
+
+import logging
+import math
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    EVENT_CLOUD_INVERTER,
+    EVENT_DEBOUNCE_POLLS,
+    EVENT_SOC_HYSTERESIS,
+    EVENT_SOC_THRESHOLDS,
+    GRID_PRESENT_VOLTAGE,
+)
+from .history import as_float
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TransitionDetector:
+    """Detect meaningful state transitions and fire them as bus events.
+
+    Mode, status, grid and connectivity changes must persist for a number of
+    consecutive polls before they fire; SOC thresholds use hysteresis so a
+    value hovering around a threshold fires only once.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        debounce: int = EVENT_DEBOUNCE_POLLS,
+        soc_thresholds: tuple[float, ...] = EVENT_SOC_THRESHOLDS,
+        soc_hysteresis: float = EVENT_SOC_HYSTERESIS,
+    ) -> None:
+        """Initialize the detector."""
+        self.hass = hass
+        self.debounce = debounce
+        self.soc_thresholds = soc_thresholds
+        self.soc_hysteresis = soc_hysteresis
+        self.goods_id: str | None = None
+        self._state: dict[str, Any] = {}
+        self._pending: dict[str, tuple[Any, int]] = {}
+        self._soc_below: dict[float, bool] = {}
+
+    def set_soc_thresholds(
+        self, thresholds: tuple[float, ...], hysteresis: float
+    ) -> None:
+        """Change the SOC thresholds and hysteresis, keeping the state of unchanged thresholds."""
+        self.soc_thresholds = thresholds
+        self.soc_hysteresis = hysteresis
+        self._soc_below = {
+            threshold: below
+            for threshold, below in self._soc_below.items()
+            if threshold in thresholds
+        }
+
+    def process(self, data: dict[str, Any]) -> None:
+        """Check a fresh snapshot for transitions."""
+        self.goods_id = data.get("GoodsID") or self.goods_id
+        self._check_online(True)
+
+        if (change := self._debounced("mode", data.get("Operatingmode"))) is not None:
+            self._fire("mode_changed", previous=change, current=self._state["mode"])
+
+        if (change := self._debounced("status", data.get("ESP32Version_Status"))) is not None:
+            self._fire("status_changed", previous=change, current=self._state["status"])
+
+        voltage = as_float(data.get("gridVac"))
+        if not math.isnan(voltage):
+            grid = voltage >= GRID_PRESENT_VOLTAGE
+            if self._debounced("grid", grid) is not None:
+                self._fire("grid_restored" if grid else "grid_lost", voltage=voltage)
+
+        soc = as_float(data.get("SOC"))
+        if not math.isnan(soc):
+            self._check_soc(soc)
+
+    def process_failure(self) -> None:
+        """Record a failed or empty poll."""
+        self._check_online(False)
+
+    def _check_online(self, online: bool) -> None:
+        """Fire when the inverter goes offline or comes back."""
+        if self._debounced("online", online) is not None:
+            self._fire("online" if online else "offline")
+
+    def _check_soc(self, soc: float) -> None:
+        """Fire when SOC crosses a configured threshold."""
+        for threshold in self.soc_thresholds:
+            below = self._soc_below.get(threshold)
+            if below is None:
+                # First reading, just arm the threshold
+                self._soc_below[threshold] = soc < threshold
+            elif not below and soc < threshold:
+                self._soc_below[threshold] = True
+                self._fire("soc_below", threshold=threshold, soc=soc)
+            elif below and soc >= min(threshold + self.soc_hysteresis, 100):
+                self._soc_below[threshold] = False
+                self._fire("soc_above", threshold=threshold, soc=soc)
+
+    def _debounced(self, name: str, value: Any) -> Any:
+        """Track a value and return the previous one once a change is confirmed.
+
+        Returns None while the value is unchanged or the change is still pending.
+        """
+        if value is None:
+            return None
+        if name not in self._state:
+            self._state[name] = value
+            return None
+        if value == self._state[name]:
+            self._pending.pop(name, None)
+            return None
+
+        pending, count = self._pending.get(name, (value, 0))
+        count = count + 1 if pending == value else 1
+        if count < self.debounce:
+            self._pending[name] = (value, count)
+            return None
+
+        self._pending.pop(name, None)
+        previous = self._state[name]
+        self._state[name] = value
+        return previous
+
+    def _fire(self, event_type: str, **data: Any) -> None:
+        """Fire a compact event on the bus."""
+        _LOGGER.debug("Firing %s event for %s: %s", event_type, self.goods_id, data)
+        self.hass.bus.async_fire(
+            EVENT_CLOUD_INVERTER, {"goods_id": self.goods_id, "type": event_type, **data}
+        )
@@ -0,0 +1,282 @@
+"""Streaming snapshot export for Cloud Inverter."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import os
+from typing import Any
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import (
+    EXPORT_BATCH_SIZE,
+    EXPORT_FLUSH_INTERVAL,
+    EXPORT_FORMAT_INFLUX,
+    EXPORT_QUEUE_SIZE,
+    EXPORT_SPILL_CHUNK_BYTES,
+    EXPORT_SPILL_MAX_BYTES,
+)
+from .history import as_float
+
+_LOGGER = logging.getLogger(__name__)
+
+MEASUREMENT = "cloud_inverter"
+
+# Client errors that are worth retrying later
+RETRY_STATUSES = {408, 429}
+
+
+class ExportRejected(Exception):
+    """The sink permanently rejected a batch, e.g. a field type conflict."""
+
+
+def typed_fields(data: dict[str, Any]) -> dict[str, float | str]:
+    """Return snapshot fields as floats where numeric, dropping empty values.
+
+    Non-finite numbers are not valid in line protocol or JSON, so strings
+    like "inf" stay strings and non-finite floats are dropped.
+    """
+    fields: dict[str, float | str] = {}
+    for key, value in data.items():
+        if value is None or value == "" or value == "-" or isinstance(value, (dict, list)):
+            continue
+        number = as_float(value)
+        if math.isfinite(number):
+            fields[key] = number
+        elif isinstance(value, str):
+            fields[key] = value
+    return fields
+
+
+def _escape_key(value: str) -> str:
+    """Escape a measurement, tag or field key for line protocol."""
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+
+def format_influx(timestamp: float, goods_id: str, data: dict[str, Any]) -> str:
+    """Format a snapshot as one InfluxDB line protocol record."""
+    fields = []
+    for key, value in typed_fields(data).items():
+        if isinstance(value, float):
+            fields.append(f"{_escape_key(key)}={value!r}")
+        else:
+            escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            fields.append(f'{_escape_key(key)}="{escaped}"')
+    return (
+        f"{MEASUREMENT},goods_id={_escape_key(str(goods_id))} "
+        f"{','.join(fields)} {int(timestamp * 1e9)}"
+    )
+
+
+def format_json(timestamp: float, goods_id: str, data: dict[str, Any]) -> str:
+    """Format a snapshot as one JSON line."""
+    return json.dumps(
+        {"time": timestamp, "goods_id": goods_id, "fields": typed_fields(data)},
+        separators=(",", ":"),
+    )
+
+
+class SnapshotExporter:
+    """Stream whole snapshots to a local file, Unix socket or HTTP endpoint.
+
+    Snapshots go through a bounded queue and are written in batches, one
+    record per poll. While the sink is unavailable, batches are appended to
+    a spill file on disk. Once the sink is back, the spill is replayed in
+    chunks after the batch that succeeded, so records may arrive out of
+    order; every record carries its own timestamp.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, target: str, export_format: str, spill_path: str
+    ) -> None:
+        """Initialize the exporter."""
+        self.hass = hass
+        self.target = target
+        self.spill_path = spill_path
+        self._format = format_influx if export_format == EXPORT_FORMAT_INFLUX else format_json
+        self._content_type = (
+            "text/plain; charset=utf-8"
+            if export_format == EXPORT_FORMAT_INFLUX
+            else "application/x-ndjson"
+        )
+        self._queue: asyncio.Queue[tuple[float, str, dict[str, Any]]] = asyncio.Queue(
+            EXPORT_QUEUE_SIZE
+        )
+        self._task: asyncio.Task | None = None
+        # Check for snapshots spilled by a previous run
+        self._spill_pending = True
+        # Bytes of the spill file already replayed
+        self._spill_offset = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Start the background writer."""
+        self._task = self.hass.async_create_background_task(
+            self._async_run(), "cloud_inverter_export"
+        )
+
+    async def async_stop(self) -> None:
+        """Stop the writer, flushing what is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        lines = []
+        while not self._queue.empty():
+            lines.append(self._format(*self._queue.get_nowait()))
+        if lines:
+            await self._async_deliver(lines)
+
+    def submit(self, timestamp: float, goods_id: str, data: dict[str, Any]) -> None:
+        """Queue a snapshot, dropping the oldest one if the queue is full."""
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait((timestamp, goods_id, data))
+
+    async def _async_run(self) -> None:
+        """Collect snapshots into batches and write them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + EXPORT_FLUSH_INTERVAL
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._queue.get(), deadline - loop.time())
+                    )
+                except asyncio.TimeoutError:
+                    break
+            await self._async_deliver([self._format(*item) for item in batch])
+
+    async def _async_deliver(self, lines: list[str]) -> None:
+        """Write lines to the sink, spilling them to disk if it is unavailable."""
+        payload = "".join(f"{line}\n" for line in lines)
+        try:
+            await self._async_write(payload)
+        except ExportRejected as err:
+            # Retrying the same batch would fail forever, so don't spill it
+            self.dropped += len(lines)
+            _LOGGER.warning(
+                "Snapshot export to %s rejected %d snapshots, dropping them: %s",
+                self.target,
+                len(lines),
+                err,
+            )
+            return
+        except (OSError, aiohttp.ClientError, asyncio.TimeoutError) as err:
+            _LOGGER.warning("Snapshot export to %s failed, spilling to disk: %s", self.target, err)
+            await self.hass.async_add_executor_job(self._write_spill, payload)
+            self._spill_pending = True
+            return
+        if self._spill_pending:
+            await self._async_replay_spill()
+
+    async def _async_replay_spill(self) -> None:
+        """Replay the spill file in chunks, resuming where a failed replay stopped."""
+        replayed = 0
+        while True:
+            chunk, offset = await self.hass.async_add_executor_job(
+                self._read_spill, self._spill_offset
+            )
+            if not chunk:
+                break
+            try:
+                await self._async_write(chunk)
+            except ExportRejected as err:
+                self.dropped += chunk.count("\n")
+                _LOGGER.warning(
+                    "Snapshot export to %s rejected %d spilled snapshots, dropping them: %s",
+                    self.target,
+                    chunk.count("\n"),
+                    err,
+                )
+            except (OSError, aiohttp.ClientError, asyncio.TimeoutError) as err:
+                _LOGGER.warning("Replaying spilled snapshots to %s failed: %s", self.target, err)
+                return
+            else:
+                replayed += chunk.count("\n")
+            self._spill_offset = offset
+
+        await self.hass.async_add_executor_job(self._remove_spill)
+        self._spill_offset = 0
+        self._spill_pending = False
+        if replayed:
+            _LOGGER.info("Replayed %d spilled snapshots to %s", replayed, self.target)
+
+    async def _async_write(self, payload: str) -> None:
+        """Write one batch to the configured sink."""
+        data = payload.encode()
+        if self.target.startswith(("http://", "https://")):
+            session = async_get_clientsession(self.hass)
+            async with asyncio.timeout(30):
+                async with session.post(
+                    self.target, data=data, headers={"Content-Type": self._content_type}
+                ) as response:
+                    if response.status >= 300:
+                        message = f"HTTP {response.status}: {await response.text()}"
+                        if 400 <= response.status < 500 and response.status not in RETRY_STATUSES:
+                            raise ExportRejected(message)
+                        raise OSError(message)
+        elif self.target.startswith("unix://"):
+            async with asyncio.timeout(30):
+                _, writer = await asyncio.open_unix_connection(self.target[len("unix://"):])
+                try:
+                    writer.write(data)
+                    await writer.drain()
+                finally:
+                    writer.close()
+                    await writer.wait_closed()
+        else:
+            path = self.target.removeprefix("file://")
+            await self.hass.async_add_executor_job(self._append, path, data)
+
+    @staticmethod
+    def _append(path: str, data: bytes) -> None:
+        """Append data to a local file."""
+        with open(path, "ab") as file:
+            file.write(data)
+
+    def _read_spill(self, offset: int) -> tuple[str, int]:
+        """Read the next chunk of whole lines from the spill file and its end offset."""
+        try:
+            with open(self.spill_path, "rb") as file:
+                file.seek(offset)
+                data = file.read(EXPORT_SPILL_CHUNK_BYTES)
+                if len(data) == EXPORT_SPILL_CHUNK_BYTES and (end := data.rfind(b"\n")) >= 0:
+                    data = data[: end + 1]
+        except FileNotFoundError:
+            return "", offset
+        return data.decode("utf-8"), offset + len(data)
+
+    def _remove_spill(self) -> None:
+        """Remove the fully replayed spill file."""
+        try:
+            os.remove(self.spill_path)
+        except FileNotFoundError:
+            pass
+
+    def _write_spill(self, payload: str) -> None:
+        """Append a failed batch to the spill file, dropping it if the file is full."""
+        data = payload.encode("utf-8")
+        try:
+            size = os.path.getsize(self.spill_path) - self._spill_offset
+        except FileNotFoundError:
+            size = 0
+        if size + len(data) > EXPORT_SPILL_MAX_BYTES:
+            self.dropped += payload.count("\n")
+            _LOGGER.warning(
+                "Export spill file is full, dropping %d new snapshots", payload.count("\n")
+            )
+            return
+        with open(self.spill_path, "ab") as file:
+            file.write(data)
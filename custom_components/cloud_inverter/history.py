@@ -0,0 +1,268 @@
+"""Snapshot history and long-term statistics for Cloud Inverter."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from array import array
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import (
+    DOMAIN,
+    HISTORY_MIN_SIZE,
+    HISTORY_RETENTION,
+    STATISTICS_COUNTERS,
+    STATISTICS_MEASUREMENTS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# A counter dropping below this fraction of its previous value is a daily reset
+COUNTER_RESET_RATIO = 0.9
+
+
+def as_float(value: Any) -> float:
+    """Convert an API value to float, using NaN for missing or non-numeric values."""
+    if value is None or value == "" or value == "-":
+        return math.nan
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return math.nan
+
+
+def history_size(interval: float) -> int:
+    """Return the ring buffer capacity needed for a poll interval (in seconds)."""
+    return max(math.ceil(HISTORY_RETENTION / interval), HISTORY_MIN_SIZE)
+
+
+class SnapshotRingBuffer:
+    """Fixed-size ring buffer of numeric snapshots.
+
+    All storage is preallocated as flat arrays of doubles, so recording a
+    sample overwrites slots in place and never allocates. When full, the
+    oldest sample is overwritten.
+    """
+
+    def __init__(self, fields: tuple[str, ...], capacity: int) -> None:
+        """Initialize the buffer."""
+        self.fields = fields
+        self.capacity = capacity
+        self.dropped = 0
+        self._width = len(fields)
+        self._timestamps = array("d", [0.0]) * capacity
+        self._values = array("d", [math.nan]) * (capacity * self._width)
+        self._start = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of buffered samples."""
+        return self._count
+
+    def resize(self, capacity: int) -> None:
+        """Change the capacity, keeping the newest samples."""
+        if capacity == self.capacity:
+            return
+        keep = min(self._count, capacity)
+        self.dropped += self._count - keep
+        timestamps = array("d", [0.0]) * capacity
+        values = array("d", [math.nan]) * (capacity * self._width)
+        for target, position in enumerate(range(self._count - keep, self._count)):
+            slot = (self._start + position) % self.capacity
+            timestamps[target] = self._timestamps[slot]
+            values[target * self._width:(target + 1) * self._width] = self._values[
+                slot * self._width:(slot + 1) * self._width
+            ]
+        self.capacity = capacity
+        self._timestamps = timestamps
+        self._values = values
+        self._start = 0
+        self._count = keep
+
+    def append(self, timestamp: float, data: Mapping[str, Any]) -> None:
+        """Record one snapshot."""
+        if self._count == self.capacity:
+            # Overwrite the oldest sample
+            self._start = (self._start + 1) % self.capacity
+            self._count -= 1
+            self.dropped += 1
+
+        slot = (self._start + self._count) % self.capacity
+        self._timestamps[slot] = timestamp
+        offset = slot * self._width
+        values = self._values
+        for index, field in enumerate(self.fields):
+            values[offset + index] = as_float(data.get(field))
+        self._count += 1
+
+    def pop_before(self, cutoff: float) -> list[tuple[float, array]]:
+        """Remove and return all samples older than cutoff, oldest first."""
+        samples = []
+        while self._count and self._timestamps[self._start] < cutoff:
+            offset = self._start * self._width
+            samples.append(
+                (self._timestamps[self._start], self._values[offset:offset + self._width])
+            )
+            self._start = (self._start + 1) % self.capacity
+            self._count -= 1
+        return samples
+
+
+class LongTermStatistics:
+    """Import completed hours from the snapshot buffer as external statistics."""
+
+    def __init__(self, hass: HomeAssistant, buffer: SnapshotRingBuffer) -> None:
+        """Initialize the statistics importer."""
+        self.hass = hass
+        self.buffer = buffer
+        self.goods_id: str | None = None
+        self._sums: dict[str, float] = {}
+        self._last_counter: dict[str, float] = {}
+        self._restored = False
+        self._overflow_logged = False
+        # The coordinator also flushes early when the buffer fills up
+        self._lock = asyncio.Lock()
+
+    @property
+    def available(self) -> bool:
+        """Return True if statistics can be imported."""
+        return self.goods_id is not None and "recorder" in self.hass.config.components
+
+    def statistic_id(self, field: str) -> str:
+        """Return the external statistic id for a field."""
+        return f"{DOMAIN}:{slugify(f'{self.goods_id}_{field}')}"
+
+    async def async_flush(self, now: datetime | None = None) -> None:
+        """Aggregate and import all completed hours in one batch per statistic."""
+        if self.buffer.dropped and not self._overflow_logged:
+            self._overflow_logged = True
+            _LOGGER.warning(
+                "Snapshot history overflowed before import, so some hours in long-term "
+                "statistics are incomplete (%d samples so far)",
+                self.buffer.dropped,
+            )
+        if not self.available:
+            return
+
+        hour_start = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+        samples = self.buffer.pop_before(hour_start.timestamp())
+        if not samples:
+            return
+
+        async with self._lock:
+            if not self._restored:
+                await self._async_restore_sums()
+
+        # Group samples by UTC hour
+        hours: dict[float, list[array]] = {}
+        for timestamp, row in samples:
+            hours.setdefault(timestamp - timestamp % 3600, []).append(row)
+
+        index = {field: i for i, field in enumerate(self.buffer.fields)}
+
+        for field, (name, unit) in STATISTICS_MEASUREMENTS.items():
+            column = index[field]
+            statistics: list[StatisticData] = []
+            for start, rows in hours.items():
+                values = [row[column] for row in rows if not math.isnan(row[column])]
+                if not values:
+                    continue
+                statistics.append(
+                    StatisticData(
+                        start=dt_util.utc_from_timestamp(start),
+                        mean=sum(values) / len(values),
+                        min=min(values),
+                        max=max(values),
+                    )
+                )
+            if statistics:
+                async_add_external_statistics(
+                    self.hass, self._metadata(field, name, unit, has_sum=False), statistics
+                )
+
+        for field, (name, unit) in STATISTICS_COUNTERS.items():
+            column = index[field]
+            statistics = []
+            for start, rows in hours.items():
+                state = math.nan
+                for row in rows:
+                    value = row[column]
+                    if math.isnan(value):
+                        continue
+                    self._accumulate(field, value)
+                    state = value
+                if math.isnan(state):
+                    continue
+                statistics.append(
+                    StatisticData(
+                        start=dt_util.utc_from_timestamp(start),
+                        state=state,
+                        sum=self._sums.get(field, 0.0),
+                    )
+                )
+            if statistics:
+                async_add_external_statistics(
+                    self.hass, self._metadata(field, name, unit, has_sum=True), statistics
+                )
+
+        _LOGGER.debug(
+            "Imported %d samples across %d hour(s) into long-term statistics",
+            len(samples),
+            len(hours),
+        )
+
+    def _accumulate(self, field: str, value: float) -> None:
+        """Add the increase of a daily counter to its running sum."""
+        previous = self._last_counter.get(field)
+        if previous is None:
+            delta = 0.0
+        elif value < previous * COUNTER_RESET_RATIO:
+            # Counter reset at midnight: everything counted since belongs to the sum
+            delta = value
+        elif value < previous:
+            # Small dip from the cloud, keep the previous reading as baseline
+            return
+        else:
+            delta = value - previous
+        self._sums[field] = self._sums.get(field, 0.0) + delta
+        self._last_counter[field] = value
+
+    async def _async_restore_sums(self) -> None:
+        """Continue running sums from the last imported statistics."""
+        self._restored = True
+        recorder = get_instance(self.hass)
+        for field in STATISTICS_COUNTERS:
+            statistic_id = self.statistic_id(field)
+            last = await recorder.async_add_executor_job(
+                get_last_statistics, self.hass, 1, statistic_id, False, {"state", "sum"}
+            )
+            if rows := last.get(statistic_id):
+                row = rows[0]
+                if row.get("sum") is not None:
+                    self._sums[field] = row["sum"]
+                if row.get("state") is not None:
+                    self._last_counter[field] = row["state"]
+
+    def _metadata(
+        self, field: str, name: str, unit: str, has_sum: bool
+    ) -> StatisticMetaData:
+        """Build statistic metadata for a field."""
+        return StatisticMetaData(
+            has_mean=not has_sum,
+            has_sum=has_sum,
+            name=f"Cloud Inverter {name}",
+            source=DOMAIN,
+            statistic_id=self.statistic_id(field),
+            unit_of_measurement=unit,
+        )
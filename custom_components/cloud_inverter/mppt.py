@@ -0,0 +1,87 @@
+"""PV string (MPPT) mismatch analysis for Cloud Inverter."""
+from __future__ import annotations
+
+import math
+from statistics import median
+
+from .const import STRING_MIN_POWER, STRING_SCORE_ALERT, STRING_SCORE_CLEAR
+
+# Weight of a new sample in the fast underperformance score
+SCORE_ALPHA = 0.1
+# Weight of a new sample in the slow per-string baseline: a time constant of
+# ~3300 polls, about three days of daylight at the 30 s default interval
+BASELINE_ALPHA = 0.0003
+
+
+class StringAnalyzer:
+    """Compare PV strings against each other on every poll.
+
+    Each string's deviation from the median is tracked against its own slow
+    baseline, so strings with different panel counts are not flagged; only
+    a string that drifts away from how it normally compares to the others
+    builds up an underperformance score. The baseline is frozen while the
+    score is raised, so a failed string is not absorbed into its own
+    baseline and stays reported until it recovers.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the analyzer."""
+        self._baseline: list[float] = []
+        self._score: list[float] = []
+        self.underperforming: set[int] = set()
+
+    def analyze(self, powers: list[float]) -> dict[str, float | None]:
+        """Return share, deviation and score for every string in one pass."""
+        count = len(powers)
+        if len(self._score) != count:
+            # String count changed, start over
+            self._baseline = [math.nan] * count
+            self._score = [0.0] * count
+            self.underperforming.clear()
+
+        valid = [power for power in powers if not math.isnan(power)]
+        if count < 2 or len(valid) < count:
+            return {}
+
+        total = sum(valid)
+        middle = median(valid)
+        daylight = middle >= STRING_MIN_POWER
+
+        shares = [power / total * 100 if total > 0 else None for power in powers]
+        deviations = [
+            (power - middle) / middle * 100 if daylight else None for power in powers
+        ]
+
+        derived: dict[str, float | None] = {}
+        for index in range(count):
+            deviation = deviations[index]
+            if deviation is not None:
+                baseline = self._baseline[index]
+                if math.isnan(baseline):
+                    baseline = deviation
+                elif self._score[index] <= STRING_SCORE_CLEAR and index not in self.underperforming:
+                    baseline += BASELINE_ALPHA * (deviation - baseline)
+                self._baseline[index] = baseline
+
+                shortfall = max(baseline - deviation, 0.0)
+                self._score[index] += SCORE_ALPHA * (shortfall - self._score[index])
+
+                if self._score[index] >= STRING_SCORE_ALERT:
+                    self.underperforming.add(index)
+                elif self._score[index] <= STRING_SCORE_CLEAR:
+                    self.underperforming.discard(index)
+
+            derived[f"Pdc_share_{index}"] = _round(shares[index])
+            derived[f"Pdc_deviation_{index}"] = _round(deviation)
+            derived[f"string_score_{index}"] = round(self._score[index], 1)
+
+        return derived
+
+    def score(self, index: int) -> float:
+        """Return the current underperformance score of a string."""
+        return self._score[index]
+
+
+def _round(value: float | None) -> float | None:
+    """Round an optional value."""
+    return None if value is None else round(value, 1)
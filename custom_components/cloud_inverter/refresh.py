@@ -0,0 +1,186 @@
+"""Rate-limited on-demand refresh service for Cloud Inverter."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+
+from .const import (
+    ATTR_ACCOUNT,
+    ATTR_PRIORITY,
+    CONF_GOODS_ID,
+    DOMAIN,
+    REFRESH_BURST,
+    REFRESH_MIN_SPACING,
+    REFRESH_PRIORITIES,
+    SERVICE_REFRESH,
+)
+
+if TYPE_CHECKING:
+    from .sensor import CloudInverterDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SCHEDULERS = f"{DOMAIN}_refresh_schedulers"
+
+REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_GOODS_ID): cv.string,
+        vol.Optional(ATTR_ACCOUNT): cv.string,
+        vol.Optional(ATTR_PRIORITY, default="normal"): vol.In(REFRESH_PRIORITIES),
+    }
+)
+
+
+class RefreshScheduler:
+    """Queue of on-demand refreshes for one cloud account.
+
+    Requests are served by priority and spaced by a token bucket. A request
+    for an inverter that already has one queued joins it, a request for an
+    inverter with a poll in flight waits for that poll, and a request is
+    skipped when a poll completed within the minimum spacing. Refreshing
+    through the coordinator also reschedules its next regular poll.
+    """
+
+    def __init__(
+        self,
+        min_spacing: float = REFRESH_MIN_SPACING,
+        burst: int = REFRESH_BURST,
+    ) -> None:
+        """Initialize the scheduler."""
+        self.min_spacing = min_spacing
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._queue: dict[
+            CloudInverterDataUpdateCoordinator, tuple[int, int, asyncio.Future]
+        ] = {}
+        self._sequence = itertools.count()
+        self._worker: asyncio.Task | None = None
+
+    async def async_request(
+        self, coordinator: CloudInverterDataUpdateCoordinator, priority: int
+    ) -> None:
+        """Queue a refresh and wait until it has completed."""
+        if queued := self._queue.get(coordinator):
+            # Merge with the queued request, keeping the more urgent priority
+            queued_priority, sequence, future = queued
+            self._queue[coordinator] = (min(priority, queued_priority), sequence, future)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._queue[coordinator] = (priority, next(self._sequence), future)
+
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._async_run())
+        await asyncio.shield(future)
+
+    def _take_token(self) -> float:
+        """Take a token, or return how long to wait until one is available."""
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated) / self.min_spacing
+        )
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) * self.min_spacing
+
+    async def _async_run(self) -> None:
+        """Serve queued requests in priority order."""
+        while self._queue:
+            coordinator = min(self._queue, key=lambda item: self._queue[item][:2])
+            joins_poll = coordinator.in_flight is not None or self._is_fresh(coordinator)
+            if not joins_poll and (delay := self._take_token()) > 0:
+                # Pick again afterwards, a more urgent request may arrive meanwhile
+                await asyncio.sleep(delay)
+                continue
+
+            _, _, future = self._queue.pop(coordinator)
+            if self._is_fresh(coordinator):
+                future.set_result(None)
+                continue
+            if joins_poll:
+                _LOGGER.debug("Joining poll of inverter %s", coordinator.api.goods_id)
+            else:
+                _LOGGER.debug("On-demand refresh of inverter %s", coordinator.api.goods_id)
+            try:
+                # Joins the poll in flight, if any
+                await coordinator.async_refresh()
+            except Exception as err:  # pylint: disable=broad-except
+                future.set_exception(err)
+                continue
+            if coordinator.last_update_success:
+                future.set_result(None)
+            else:
+                future.set_exception(
+                    HomeAssistantError(
+                        f"Refresh of inverter {coordinator.api.goods_id} failed"
+                    )
+                )
+
+    def _is_fresh(self, coordinator: CloudInverterDataUpdateCoordinator) -> bool:
+        """Return True if a poll completed within the minimum spacing."""
+        return time.monotonic() - coordinator.refreshed_at < self.min_spacing
+
+    def cancel(self) -> None:
+        """Cancel the worker and any queued requests."""
+        if self._worker is not None:
+            self._worker.cancel()
+        for _, _, future in self._queue.values():
+            future.cancel()
+        self._queue.clear()
+
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the refresh service."""
+    if hass.services.has_service(DOMAIN, SERVICE_REFRESH):
+        return
+
+    schedulers: dict[str, RefreshScheduler] = hass.data.setdefault(DATA_SCHEDULERS, {})
+
+    async def async_handle_refresh(call: ServiceCall) -> None:
+        """Refresh the targeted inverters."""
+        goods_id = call.data.get(CONF_GOODS_ID)
+        account = call.data.get(ATTR_ACCOUNT)
+        priority = REFRESH_PRIORITIES[call.data[ATTR_PRIORITY]]
+
+        coordinators = [
+            entry_data["coordinator"]
+            for entry_data in hass.data.get(DOMAIN, {}).values()
+            if "coordinator" in entry_data
+            and (goods_id is None or entry_data["goods_id"] == goods_id)
+            and (account is None or entry_data["coordinator"].api.username == account)
+        ]
+        if not coordinators:
+            raise HomeAssistantError("No matching Cloud Inverter found to refresh")
+
+        await asyncio.gather(
+            *(
+                schedulers.setdefault(
+                    coordinator.api.username, RefreshScheduler()
+                ).async_request(coordinator, priority)
+                for coordinator in coordinators
+            )
+        )
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_REFRESH, async_handle_refresh, schema=REFRESH_SCHEMA
+    )
+
+
+def async_unload_services(hass: HomeAssistant) -> None:
+    """Remove the refresh service once no entries are left."""
+    if hass.data.get(DOMAIN):
+        return
+    for scheduler in hass.data.pop(DATA_SCHEDULERS, {}).values():
+        scheduler.cancel()
+    hass.services.async_remove(DOMAIN, SERVICE_REFRESH)
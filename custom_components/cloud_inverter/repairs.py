@@ -0,0 +1,57 @@
+"""Repairs for Cloud Inverter."""
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant import data_entry_flow
+from homeassistant.components.repairs import ConfirmRepairFlow, RepairsFlow
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import issue_registry as ir
+
+from .const import CONF_EXPOSED_FIELDS, DOMAIN
+
+
+class ExposeFieldsRepairFlow(ConfirmRepairFlow):
+    """Create disabled sensors for new numeric payload fields."""
+
+    def __init__(
+        self, entry_id: str, fields: list[str], placeholders: dict[str, str]
+    ) -> None:
+        """Initialize the flow."""
+        self._entry_id = entry_id
+        self._fields = fields
+        self._placeholders = placeholders
+
+    async def async_step_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> data_entry_flow.FlowResult:
+        """Expose the fields once the user confirms."""
+        if user_input is not None:
+            if entry := self.hass.config_entries.async_get_entry(self._entry_id):
+                exposed = set(entry.options.get(CONF_EXPOSED_FIELDS, [])) | set(self._fields)
+                # The options update listener adds the sensors without a reload
+                self.hass.config_entries.async_update_entry(
+                    entry, options={**entry.options, CONF_EXPOSED_FIELDS: sorted(exposed)}
+                )
+            return self.async_create_entry(title="", data={})
+
+        return self.async_show_form(
+            step_id="confirm",
+            data_schema=vol.Schema({}),
+            description_placeholders=self._placeholders,
+        )
+
+
+async def async_create_fix_flow(
+    hass: HomeAssistant,
+    issue_id: str,
+    data: dict[str, Any] | None,
+) -> RepairsFlow:
+    """Create a flow to fix a repair issue."""
+    data = data or {}
+    issue = ir.async_get(hass).async_get_issue(DOMAIN, issue_id)
+    placeholders = dict(issue.translation_placeholders or {}) if issue else {}
+    fields = [field for field in str(data.get("fields") or "").split(",") if field]
+    return ExposeFieldsRepairFlow(data.get("entry_id", ""), fields, placeholders)
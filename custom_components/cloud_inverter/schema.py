@@ -0,0 +1,67 @@
+"""Payload schema fingerprinting and compiled field mapping for Cloud Inverter."""
+from __future__ import annotations
+
+from collections.abc import Collection
+from typing import Any
+
+# One mapping step: (target key, source key, list index / dict key or None)
+MappingStep = tuple[str, str, int | str | None]
+
+
+def payload_fingerprint(data: dict[str, Any]) -> int:
+    """Return a hash of the payload's key set, value types and array lengths."""
+    return hash(
+        tuple(
+            (
+                key,
+                type(value).__name__,
+                len(value) if isinstance(value, (list, dict)) else -1,
+                tuple(value) if isinstance(value, dict) else None,
+            )
+            for key, value in data.items()
+        )
+    )
+
+
+def schema_keys(data: dict[str, Any]) -> set[str]:
+    """Return every flattened key a payload provides (outside the "data" arrays)."""
+    keys = set()
+    for key, value in data.items():
+        if key == "data":
+            continue
+        if isinstance(value, dict):
+            keys.update(f"{key}_{subkey}" for subkey in value)
+        else:
+            keys.add(key)
+    return keys
+
+
+def compile_mapping(data: dict[str, Any], mapped: Collection[str]) -> list[MappingStep]:
+    """Compile the steps that copy mapped top-level fields into the flattened data.
+
+    Unmapped keys get no step, so the per-poll fast path never touches them.
+    """
+    steps: list[MappingStep] = []
+    for key, value in data.items():
+        if key == "data":
+            continue
+        if isinstance(value, list) and value:
+            if key in mapped:
+                steps.append((key, key, 0))
+        elif isinstance(value, dict):
+            # Nested dicts like ESP32Version become ESP32Version_Status etc.
+            for subkey in value:
+                if f"{key}_{subkey}" in mapped:
+                    steps.append((f"{key}_{subkey}", key, subkey))
+        elif key in mapped:
+            steps.append((key, key, None))
+    return steps
+
+
+def apply_mapping(
+    steps: list[MappingStep], data: dict[str, Any], flattened: dict[str, Any]
+) -> None:
+    """Copy mapped fields from a payload using compiled steps."""
+    for target, key, item in steps:
+        value = data[key]
+        flattened[target] = value if item is None else value[item]
@@ -1,7 +1,10 @@
 """Sensor platform for Cloud Inverter."""
 from __future__ import annotations
 
+import asyncio
 import logging
+import math
+import time
 from datetime import timedelta
 from typing import Any
 
@@ -13,151 +16,311 @@ from homeassistant.components.sensor import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     PERCENTAGE,
+    SUN_EVENT_SUNRISE,
     UnitOfElectricCurrent,
     UnitOfElectricPotential,
     UnitOfEnergy,
     UnitOfFrequency,
     UnitOfPower,
     UnitOfTemperature,
+    UnitOfTime,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er, issue_registry as ir
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.sun import get_astral_event_next
+from homeassistant.util.ssl import client_context
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
     DataUpdateCoordinator,
     UpdateFailed,
 )
 
-from .api import CloudInverterAPI
+from .api import CloudInverterAPI, DEFAULT_MAX_CONCURRENT_REQUESTS, keepalive_timeout
+from .battery import BatteryEstimator
+from .capture import PayloadCapture
 from .const import (
     DOMAIN,
     UPDATE_INTERVAL,
     CONF_USERNAME,
     CONF_PASSWORD,
+    CONF_SCAN_INTERVAL,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_SENSOR_GROUPS,
+    CONF_POWER_DEADBAND,
+    CONF_VOLTAGE_DEADBAND,
+    CONF_CURRENT_DEADBAND,
+    CONF_EXPOSED_FIELDS,
+    CONF_SOC_HYSTERESIS,
+    CONF_SOC_THRESHOLDS,
+    EVENT_SOC_HYSTERESIS,
+    EVENT_SOC_THRESHOLDS,
+    SIGNAL_COORDINATOR_READY,
+    OPTIONAL_SENSOR_GROUPS,
+    STATISTICS_COUNTERS,
+    STATISTICS_FLUSH_INTERVAL,
+    STATISTICS_MEASUREMENTS,
+    CONF_EXPORT_FORMAT,
+    CONF_EXPORT_TARGET,
+    EXPORT_FORMAT_INFLUX,
+    CONF_CAPTURE,
+)
+from .energy import EnergyBalance
+from .events import TransitionDetector
+from .export import SnapshotExporter
+from .history import LongTermStatistics, SnapshotRingBuffer, as_float, history_size
+from .mppt import StringAnalyzer
+from .schema import (
+    MappingStep,
+    apply_mapping,
+    compile_mapping,
+    payload_fingerprint,
+    schema_keys,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
 
+# Sensor definitions by group: (data key, name, unit, device class, state class)
+SENSOR_GROUPS: dict[str, list[tuple]] = {
+    # Photovoltaic (Solar)
+    "solar": [
+        ("Pac", "PV Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+    ],
+    # Production
+    "production": [
+        ("EToday", "Daily Energy", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("ETotal", "Total Energy", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("Peackpower", "Peak Power Today", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+    ],
+    # Grid
+    "grid": [
+        ("gridVac", "Grid Voltage", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
+        ("gridIac", "Grid Current", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
+        ("gridFac", "Grid Frequency", UnitOfFrequency.HERTZ, SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT),
+        ("gridCurrpac", "Grid Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+        ("ETDay", "Grid Export Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("EFDay", "Grid Import Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("ETTotal", "Grid Export Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("EFTotal", "Grid Import Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+    ],
+    # Battery
+    "battery": [
+        ("volt", "Battery Voltage", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
+        ("cur", "Battery Current", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
+        ("battery_power", "Battery Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+        ("SOC", "Battery SOC", PERCENTAGE, SensorDeviceClass.BATTERY, SensorStateClass.MEASUREMENT),
+        ("SOH", "Battery SOH", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
+        ("toPbat", "Battery Charging Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+        ("fromPbat", "Battery Discharging Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+        ("batChrg", "Battery Charge Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("batDischrg", "Battery Discharge Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("Etotal_batChrg", "Battery Charge Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("Etotal_batDischrg", "Battery Discharge Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("brand", "Battery Type", None, None, None),
+        ("capacity", "Battery Capacity", "Ah", None, SensorStateClass.MEASUREMENT),
+        ("battery_time_to_full", "Battery Time To Full", UnitOfTime.MINUTES, SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT),
+        ("battery_time_to_empty", "Battery Time To Empty", UnitOfTime.MINUTES, SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT),
+        ("battery_soc_at_sunrise", "Battery SOC At Sunrise", PERCENTAGE, SensorDeviceClass.BATTERY, SensorStateClass.MEASUREMENT),
+    ],
+    # Home Load (EPS)
+    "eps": [
+        ("epsVac", "Home Load Voltage", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
+        ("epsIac", "Home Load Current", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
+        ("epsFac", "Home Load Frequency", UnitOfFrequency.HERTZ, SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT),
+        ("epsCurrpac", "Home Load Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+        ("EPSDay", "Home Load Energy Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("EPSTotal", "Home Load Energy Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+    ],
+    # Heavy Load (Generator)
+    "generator": [
+        ("genVac", "Heavy Load Voltage", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
+        ("genIac", "Heavy Load Current", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
+        ("genFac", "Heavy Load Frequency", UnitOfFrequency.HERTZ, SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT),
+        ("genCurrpac", "Heavy Load Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+        ("GENDay", "Heavy Load Energy Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("GENTotal", "Heavy Load Energy Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+    ],
+    # On-Grid Load
+    "on_grid_load": [
+        ("loadVac", "On-Grid Load Voltage", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
+        ("loadIac", "On-Grid Load Current", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
+        ("loadFac", "On-Grid Load Frequency", UnitOfFrequency.HERTZ, SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT),
+        ("loadCurrpac", "On-Grid Load Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+        ("ELDay", "On-Grid Load Energy Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("ELTotal", "On-Grid Load Energy Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+    ],
+    # System
+    "system": [
+        ("Tntc", "Inverter Temperature", UnitOfTemperature.CELSIUS, SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT),
+        ("Operatingmode", "Operating Mode", None, None, None),
+        ("Dailyself_userate", "Self Consumption Rate", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
+        ("Dailyself_sufficiencyrate", "Self Sufficiency Rate", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
+    ],
+    # Energy Balance (calculated by the coordinator)
+    "energy_balance": [
+        ("house_consumption", "House Consumption", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+        ("pv_self_use", "PV Self Use", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+        ("net_grid_power", "Net Grid Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+        ("house_consumption_today", "House Consumption Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+        ("self_consumption_rate_calculated", "Calculated Self Consumption Rate", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
+        ("self_sufficiency_rate_calculated", "Calculated Self Sufficiency Rate", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
+        ("battery_round_trip_efficiency", "Battery Round Trip Efficiency", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
+    ],
+    # Diagnostics and Device Info
+    "diagnostics": [
+        ("WifiStrength", "WiFi Strength", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
+        ("ESP32Version_Status", "Inverter Status", None, None, None),
+        ("modelName", "Model", None, None, None),
+        ("GoodsID", "Serial Number", None, None, None),
+        ("FirmwareVersion", "Firmware Version", None, None, None),
+    ],
+}
+
+
+# Every payload field used by a sensor; other top-level keys are not copied
+MAPPED_KEYS = frozenset(
+    description[0] for descriptions in SENSOR_GROUPS.values() for description in descriptions
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Cloud Inverter sensors."""
-    username = entry.data[CONF_USERNAME]
-    password = entry.data[CONF_PASSWORD]
-    goods_id = entry.data.get("goods_id")  # Get the selected inverter ID
-    
-    api = CloudInverterAPI(username, password)
+    api = await _async_create_api(hass, entry)
     
-    # Set the goods_id directly if provided
-    if goods_id:
-        api.goods_id = goods_id
-        _LOGGER.info("Using pre-configured inverter GoodsID: %s", goods_id)
-    
-    # Create coordinator
+    # Create coordinator and apply the entry's runtime options
     coordinator = CloudInverterDataUpdateCoordinator(hass, api)
-    await coordinator.async_config_entry_first_refresh()
+    await coordinator.async_apply_options(entry)
+    try:
+        await coordinator.async_config_entry_first_refresh()
+    except Exception:
+        if coordinator.exporter is not None:
+            await coordinator.exporter.async_stop()
+        await coordinator.api.close()
+        raise
+    hass.data[DOMAIN][entry.entry_id]["coordinator"] = coordinator
+    # Let live WebSocket streams follow the entry across reloads
+    async_dispatcher_send(hass, SIGNAL_COORDINATOR_READY, entry.entry_id)
     
-    # Create all sensors
-    sensors = []
-    
-    # Photovoltaic (Solar) Sensors
-    sensors.extend([
-        CloudInverterSensor(coordinator, "Pac", "PV Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "Vdc_0", "PV Voltage MPPT1", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "Vdc_1", "PV Voltage MPPT2", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "Idc_0", "PV Current MPPT1", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "Idc_1", "PV Current MPPT2", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "Pdc_0", "PV Power MPPT1", UnitOfPower.KILO_WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "Pdc_1", "PV Power MPPT2", UnitOfPower.KILO_WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-    ])
-    
-    # Production Sensors
-    sensors.extend([
-        CloudInverterSensor(coordinator, "EToday", "Daily Energy", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "ETotal", "Total Energy", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "Peackpower", "Peak Power Today", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-    ])
+    # Periodically import completed hours into long-term statistics
+    entry.async_on_unload(
+        async_track_time_interval(
+            hass,
+            coordinator.statistics.async_flush,
+            timedelta(seconds=STATISTICS_FLUSH_INTERVAL),
+        )
+    )
     
-    # Grid Sensors
-    sensors.extend([
-        CloudInverterSensor(coordinator, "gridVac", "Grid Voltage", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "gridIac", "Grid Current", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "gridFac", "Grid Frequency", UnitOfFrequency.HERTZ, SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "gridCurrpac", "Grid Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "ETDay", "Grid Export Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "EFDay", "Grid Import Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "ETTotal", "Grid Export Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "EFTotal", "Grid Import Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-    ])
+    # Sensor groups can be switched on and off from the options without a reload
+    group_sensors: dict[str, list[CloudInverterSensor]] = {}
+    exposed_sensors: dict[str, CloudInverterSensor] = {}
     
-    # Battery Sensors
-    sensors.extend([
-        CloudInverterSensor(coordinator, "volt", "Battery Voltage", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "cur", "Battery Current", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "battery_power", "Battery Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "SOC", "Battery SOC", PERCENTAGE, SensorDeviceClass.BATTERY, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "SOH", "Battery SOH", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "toPbat", "Battery Charging Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "fromPbat", "Battery Discharging Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "batChrg", "Battery Charge Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "batDischrg", "Battery Discharge Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "Etotal_batChrg", "Battery Charge Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "Etotal_batDischrg", "Battery Discharge Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "brand", "Battery Type", None, None, None),
-        CloudInverterSensor(coordinator, "capacity", "Battery Capacity", "Ah", None, SensorStateClass.MEASUREMENT),
-    ])
+    @callback
+    def _async_sync_sensor_groups() -> None:
+        enabled = entry.options.get(CONF_SENSOR_GROUPS, list(OPTIONAL_SENSOR_GROUPS))
+        registry = er.async_get(hass)
+        new_sensors = []
+        for group, descriptions in SENSOR_GROUPS.items():
+            if group not in OPTIONAL_SENSOR_GROUPS or group in enabled:
+                if group not in group_sensors:
+                    group_sensors[group] = [
+                        CloudInverterSensor(coordinator, *description)
+                        for description in descriptions
+                    ]
+                    new_sensors.extend(group_sensors[group])
+                continue
+            
+            # Removing the registry entry also removes the live entity
+            group_sensors.pop(group, None)
+            for description in descriptions:
+                if entity_id := registry.async_get_entity_id(
+                    "sensor", DOMAIN, f"cloud_inverter_{description[0]}"
+                ):
+                    registry.async_remove(entity_id)
+        
+        # Unknown payload fields exposed from a schema drift repair, disabled by default
+        for field in entry.options.get(CONF_EXPOSED_FIELDS, []):
+            if field not in exposed_sensors:
+                sensor = CloudInverterSensor(
+                    coordinator, field, field, None, None, SensorStateClass.MEASUREMENT
+                )
+                sensor._attr_entity_registry_enabled_default = False
+                exposed_sensors[field] = sensor
+                new_sensors.append(sensor)
+        
+        if new_sensors:
+            async_add_entities(new_sensors)
     
-    # Home Load (EPS) Sensors
-    sensors.extend([
-        CloudInverterSensor(coordinator, "epsVac", "Home Load Voltage", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "epsIac", "Home Load Current", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "epsFac", "Home Load Frequency", UnitOfFrequency.HERTZ, SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "epsCurrpac", "Home Load Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "EPSDay", "Home Load Energy Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "EPSTotal", "Home Load Energy Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-    ])
+    _async_sync_sensor_groups()
+    hass.data[DOMAIN][entry.entry_id]["sync_sensor_groups"] = _async_sync_sensor_groups
     
-    # Heavy Load (Generator) Sensors
-    sensors.extend([
-        CloudInverterSensor(coordinator, "genVac", "Heavy Load Voltage", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "genIac", "Heavy Load Current", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "genFac", "Heavy Load Frequency", UnitOfFrequency.HERTZ, SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "genCurrpac", "Heavy Load Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "GENDay", "Heavy Load Energy Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "GENTotal", "Heavy Load Energy Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-    ])
+    # Per-string (MPPT) sensors are created on demand as strings show up
+    known_strings = 0
+    analyzed_strings = 0
     
-    # On-Grid Load Sensors
-    sensors.extend([
-        CloudInverterSensor(coordinator, "loadVac", "On-Grid Load Voltage", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "loadIac", "On-Grid Load Current", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "loadFac", "On-Grid Load Frequency", UnitOfFrequency.HERTZ, SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "loadCurrpac", "On-Grid Load Power", UnitOfPower.WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "ELDay", "On-Grid Load Energy Today", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-        CloudInverterSensor(coordinator, "ELTotal", "On-Grid Load Energy Total", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-    ])
+    @callback
+    def _async_add_string_sensors() -> None:
+        nonlocal known_strings, analyzed_strings
+        string_count = coordinator.string_count
+        new_sensors = []
+        for index in range(known_strings, string_count):
+            new_sensors.extend(_string_sensors(coordinator, index))
+        known_strings = max(known_strings, string_count)
+        # Strings can only be compared once there are at least two of them
+        if string_count >= 2:
+            for index in range(analyzed_strings, string_count):
+                new_sensors.extend(_string_analysis_sensors(coordinator, index))
+            analyzed_strings = string_count
+        if new_sensors:
+            async_add_entities(new_sensors)
     
-    # System Sensors
-    sensors.extend([
-        CloudInverterSensor(coordinator, "Tntc", "Inverter Temperature", UnitOfTemperature.CELSIUS, SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "WifiStrength", "WiFi Strength", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "ESP32Version_Status", "Inverter Status", None, None, None),
-        CloudInverterSensor(coordinator, "Operatingmode", "Operating Mode", None, None, None),
-        CloudInverterSensor(coordinator, "Dailyself_userate", "Self Consumption Rate", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
-        CloudInverterSensor(coordinator, "Dailyself_sufficiencyrate", "Self Sufficiency Rate", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
-    ])
+    _async_add_string_sensors()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_string_sensors))
+
+
+async def _async_create_api(hass: HomeAssistant, entry: ConfigEntry) -> CloudInverterAPI:
+    """Create the API client."""
+    # Dedicated pooled session, closed when the entry is unloaded
+    api = CloudInverterAPI(
+        entry.data[CONF_USERNAME], entry.data[CONF_PASSWORD], ssl_context=client_context()
+    )
     
-    # Device Info Sensors
-    sensors.extend([
-        CloudInverterSensor(coordinator, "modelName", "Model", None, None, None),
-        CloudInverterSensor(coordinator, "GoodsID", "Serial Number", None, None, None),
-        CloudInverterSensor(coordinator, "FirmwareVersion", "Firmware Version", None, None, None),
-    ])
+    # Set the goods_id directly if provided
+    if goods_id := entry.data.get("goods_id"):
+        api.goods_id = goods_id
+        _LOGGER.info("Using pre-configured inverter GoodsID: %s", goods_id)
     
-    async_add_entities(sensors)
+    return api
+
+
+def _string_sensors(
+    coordinator: CloudInverterDataUpdateCoordinator, index: int
+) -> list[CloudInverterSensor]:
+    """Create the sensors for one PV string."""
+    mppt = f"MPPT{index + 1}"
+    return [
+        CloudInverterSensor(coordinator, f"Vdc_{index}", f"PV Voltage {mppt}", UnitOfElectricPotential.VOLT, SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
+        CloudInverterSensor(coordinator, f"Idc_{index}", f"PV Current {mppt}", UnitOfElectricCurrent.AMPERE, SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
+        CloudInverterSensor(coordinator, f"Pdc_{index}", f"PV Power {mppt}", UnitOfPower.KILO_WATT, SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+    ]
+
+
+def _string_analysis_sensors(
+    coordinator: CloudInverterDataUpdateCoordinator, index: int
+) -> list[CloudInverterSensor]:
+    """Create the sensors comparing one PV string with the others."""
+    mppt = f"MPPT{index + 1}"
+    return [
+        CloudInverterSensor(coordinator, f"Pdc_share_{index}", f"PV Power Share {mppt}", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
+        CloudInverterSensor(coordinator, f"Pdc_deviation_{index}", f"PV Deviation From Median {mppt}", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
+        CloudInverterSensor(coordinator, f"string_score_{index}", f"PV Underperformance {mppt}", PERCENTAGE, None, SensorStateClass.MEASUREMENT),
+    ]
 
 
 class CloudInverterDataUpdateCoordinator(DataUpdateCoordinator):
@@ -172,6 +335,40 @@ class CloudInverterDataUpdateCoordinator(DataUpdateCoordinator):
             update_interval=timedelta(seconds=UPDATE_INTERVAL),
         )
         self.api = api
+        self.history = SnapshotRingBuffer(
+            tuple(STATISTICS_MEASUREMENTS) + tuple(STATISTICS_COUNTERS),
+            history_size(UPDATE_INTERVAL),
+        )
+        self.statistics = LongTermStatistics(hass, self.history)
+        self.energy_balance = EnergyBalance()
+        self.battery_estimator = BatteryEstimator()
+        self._next_sunrise: float | None = None
+        self.string_analyzer = StringAnalyzer()
+        self.string_count = 0
+        self._string_issues: set[int] = set()
+        self.transitions = TransitionDetector(hass)
+        self.refreshed_at = 0.0
+        self.in_flight: asyncio.Future | None = None
+        self.exporter: SnapshotExporter | None = None
+        self.deadbands: dict[SensorDeviceClass, float] = {}
+        self._options: dict[str, Any] | None = None
+        self._entry_id: str | None = None
+        self.exposed_fields: set[str] = set()
+        self._fingerprint: int | None = None
+        self._mapping: list[MappingStep] = []
+        self._schema_keys: set[str] | None = None
+
+    async def _async_refresh(self, *args: Any, **kwargs: Any) -> None:
+        """Refresh data, joining a poll that is already in flight."""
+        if self.in_flight is not None:
+            await asyncio.shield(self.in_flight)
+            return
+        self.in_flight = self.hass.loop.create_future()
+        try:
+            await super()._async_refresh(*args, **kwargs)
+        finally:
+            self.in_flight.set_result(None)
+            self.in_flight = None
 
     async def _async_update_data(self) -> dict[str, Any]:
         """Fetch data from API."""
@@ -182,6 +379,7 @@ class CloudInverterDataUpdateCoordinator(DataUpdateCoordinator):
             
             if not data:
                 _LOGGER.warning("No data returned from API")
+                self.transitions.process_failure()
                 # Return empty dict but don't fail - sensors will show unavailable
                 return {}
             
@@ -194,33 +392,24 @@ class CloudInverterDataUpdateCoordinator(DataUpdateCoordinator):
                 # Handle arrays in data
                 if "Pac" in raw_data and isinstance(raw_data["Pac"], list) and raw_data["Pac"]:
                     flattened_data["Pac"] = raw_data["Pac"][0]
-                if "Pdc" in raw_data and isinstance(raw_data["Pdc"], list):
-                    if len(raw_data["Pdc"]) > 0:
-                        flattened_data["Pdc_0"] = raw_data["Pdc"][0]
-                    if len(raw_data["Pdc"]) > 1:
-                        flattened_data["Pdc_1"] = raw_data["Pdc"][1]
-                if "Vdc" in raw_data and isinstance(raw_data["Vdc"], list):
-                    if len(raw_data["Vdc"]) > 0:
-                        flattened_data["Vdc_0"] = raw_data["Vdc"][0]
-                    if len(raw_data["Vdc"]) > 1:
-                        flattened_data["Vdc_1"] = raw_data["Vdc"][1]
-                if "Idc" in raw_data and isinstance(raw_data["Idc"], list):
-                    if len(raw_data["Idc"]) > 0:
-                        flattened_data["Idc_0"] = raw_data["Idc"][0]
-                    if len(raw_data["Idc"]) > 1:
-                        flattened_data["Idc_1"] = raw_data["Idc"][1]
+                # One entry per PV string, any number of MPPTs
+                for key in ("Pdc", "Vdc", "Idc"):
+                    if isinstance(raw_data.get(key), list):
+                        self.string_count = max(self.string_count, len(raw_data[key]))
+                        for index, value in enumerate(raw_data[key]):
+                            flattened_data[f"{key}_{index}"] = value
+                
+                if isinstance(raw_data.get("Pdc"), list):
+                    powers = [as_float(value) for value in raw_data["Pdc"]]
+                    flattened_data.update(self.string_analyzer.analyze(powers))
+                    self._update_string_issues(flattened_data)
             
-            # Copy all other data
-            for key, value in data.items():
-                if key != "data":
-                    if isinstance(value, list) and value:
-                        flattened_data[key] = value[0]
-                    elif isinstance(value, dict):
-                        # Handle nested dicts like ESP32Version
-                        for subkey, subvalue in value.items():
-                            flattened_data[f"{key}_{subkey}"] = subvalue
-                    else:
-                        flattened_data[key] = value
+            # Copy the mapped top-level fields, recompiling only when the schema changes
+            fingerprint = payload_fingerprint(data)
+            if fingerprint != self._fingerprint:
+                self._compile_schema(data)
+                self._fingerprint = fingerprint
+            apply_mapping(self._mapping, data, flattened_data)
             
             # Calculate battery power (charging is positive, discharging is negative)
             if "toPbat" in flattened_data and "fromPbat" in flattened_data:
@@ -231,13 +420,199 @@ class CloudInverterDataUpdateCoordinator(DataUpdateCoordinator):
                 except (ValueError, TypeError):
                     flattened_data["battery_power"] = 0
             
+            # Calculate energy balance metrics in a single pass
+            flattened_data.update(self.energy_balance.compute(flattened_data))
+            
+            # Update battery runtime estimates
+            now = time.time()
+            flattened_data.update(
+                self.battery_estimator.update(now, flattened_data, self._sunrise(now))
+            )
+            
+            # Fire events for mode, status, grid, SOC and connectivity changes
+            self.transitions.process(flattened_data)
+            
+            if self.statistics.goods_id is None:
+                self.statistics.goods_id = flattened_data.get("GoodsID") or self.api.goods_id
+            # Keep a bounded history of numeric fields for statistics import
+            if self.statistics.available:
+                self.history.append(now, flattened_data)
+                if len(self.history) == self.history.capacity:
+                    # Import completed hours now rather than overwrite them
+                    self.hass.async_create_task(self.statistics.async_flush())
+            self.refreshed_at = time.monotonic()
+            if self.exporter is not None:
+                self.exporter.submit(now, self.statistics.goods_id, flattened_data)
+            
             _LOGGER.debug("Flattened data: %s", flattened_data)
             return flattened_data
             
         except Exception as err:
             _LOGGER.error("Error communicating with API: %s", err, exc_info=True)
+            self.transitions.process_failure()
             raise UpdateFailed(f"Error communicating with API: {err}")
 
+    async def async_apply_options(self, entry: ConfigEntry) -> None:
+        """Apply runtime options to the running coordinator and API client."""
+        options = dict(entry.options)
+        previous = self._options
+        self._options = options
+        self._entry_id = entry.entry_id
+        
+        # Newly exposed fields need the mapping to be recompiled
+        exposed_fields = set(options.get(CONF_EXPOSED_FIELDS, []))
+        if exposed_fields != self.exposed_fields:
+            self.exposed_fields = exposed_fields
+            self._fingerprint = None
+        
+        self.update_interval = timedelta(
+            seconds=options.get(CONF_SCAN_INTERVAL, UPDATE_INTERVAL)
+        )
+        # Hold a completed hour until the next statistics flush, whatever the interval
+        self.history.resize(history_size(self.update_interval.total_seconds()))
+        self.api.set_keepalive_timeout(keepalive_timeout(self.update_interval.total_seconds()))
+        
+        self.api.set_max_concurrent_requests(
+            options.get(CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS)
+        )
+        
+        # Sample raw responses into a compressed archive for debugging
+        if options.get(CONF_CAPTURE):
+            if self.api.capture is None:
+                self.api.capture = PayloadCapture(
+                    self.hass, self.hass.config.path(f"{DOMAIN}_capture", entry.entry_id)
+                )
+        else:
+            self.api.capture = None
+        
+        self.transitions.set_soc_thresholds(
+            tuple(options.get(CONF_SOC_THRESHOLDS, EVENT_SOC_THRESHOLDS)),
+            options.get(CONF_SOC_HYSTERESIS, EVENT_SOC_HYSTERESIS),
+        )
+        
+        self.deadbands = {
+            SensorDeviceClass.POWER: options.get(CONF_POWER_DEADBAND, 0),
+            SensorDeviceClass.VOLTAGE: options.get(CONF_VOLTAGE_DEADBAND, 0),
+            SensorDeviceClass.CURRENT: options.get(CONF_CURRENT_DEADBAND, 0),
+        }
+        
+        # Optionally stream every snapshot to a local time-series sink
+        export = (options.get(CONF_EXPORT_TARGET), options.get(CONF_EXPORT_FORMAT))
+        if previous is None or export != (
+            previous.get(CONF_EXPORT_TARGET),
+            previous.get(CONF_EXPORT_FORMAT),
+        ):
+            if self.exporter is not None:
+                await self.exporter.async_stop()
+                self.exporter = None
+            if export[0]:
+                self.exporter = SnapshotExporter(
+                    self.hass,
+                    export[0],
+                    export[1] or EXPORT_FORMAT_INFLUX,
+                    self.hass.config.path(f".{DOMAIN}_{entry.entry_id}_export_spill"),
+                )
+                self.exporter.start()
+
+    def _compile_schema(self, data: dict[str, Any]) -> None:
+        """Compile the field mapping for a new payload schema and report drift."""
+        self._mapping = compile_mapping(data, MAPPED_KEYS | self.exposed_fields)
+        keys = schema_keys(data)
+        previous, self._schema_keys = self._schema_keys, keys
+        _LOGGER.debug("Compiled mapping for %d of %d payload fields", len(self._mapping), len(keys))
+        if keys == previous:
+            return
+        
+        # Compare with the schema an open issue was raised for, also after a restart
+        goods_id = data.get("GoodsID") or self.api.goods_id
+        issue_id = f"schema_drift_{goods_id}"
+        issue = ir.async_get(self.hass).async_get_issue(DOMAIN, issue_id)
+        base = previous
+        if issue and issue.data and issue.data.get("schema"):
+            base = set(str(issue.data["schema"]).split(","))
+        if base is None:
+            return
+        if keys == base:
+            if issue:
+                _LOGGER.info("Inverter payload schema is back to the previous fields")
+                ir.async_delete_issue(self.hass, DOMAIN, issue_id)
+            return
+        
+        added = sorted(keys - base)
+        removed = sorted(base - keys)
+        _LOGGER.warning(
+            "Inverter payload schema changed. Added: %s. Removed: %s",
+            ", ".join(added) or "none",
+            ", ".join(removed) or "none",
+        )
+        
+        # New numeric fields can be exposed as disabled sensors from the repair
+        flattened = {}
+        apply_mapping(compile_mapping(data, added), data, flattened)
+        numeric = [
+            key for key in added
+            if key not in MAPPED_KEYS and not math.isnan(as_float(flattened.get(key)))
+        ]
+        ir.async_create_issue(
+            self.hass,
+            DOMAIN,
+            issue_id,
+            is_fixable=bool(numeric),
+            severity=ir.IssueSeverity.WARNING,
+            translation_key="schema_drift_new_fields" if numeric else "schema_drift",
+            translation_placeholders={
+                "serial": str(goods_id),
+                "added": ", ".join(added) or "none",
+                "removed": ", ".join(removed) or "none",
+                "numeric": ", ".join(numeric) or "none",
+            },
+            # Issue data only holds scalars, so field lists are comma-joined
+            data={
+                "entry_id": self._entry_id,
+                "fields": ",".join(numeric),
+                "schema": ",".join(sorted(base)),
+            },
+        )
+
+    def _update_string_issues(self, data: dict[str, Any]) -> None:
+        """Raise or clear repair issues for underperforming PV strings."""
+        underperforming = self.string_analyzer.underperforming
+        if underperforming == self._string_issues:
+            return
+        
+        goods_id = data.get("GoodsID") or self.api.goods_id
+        for index in self._string_issues - underperforming:
+            _LOGGER.info("PV string MPPT%d has recovered", index + 1)
+            ir.async_delete_issue(self.hass, DOMAIN, f"string_underperforming_{goods_id}_{index}")
+        for index in underperforming - self._string_issues:
+            _LOGGER.warning("PV string MPPT%d is underperforming", index + 1)
+            ir.async_create_issue(
+                self.hass,
+                DOMAIN,
+                f"string_underperforming_{goods_id}_{index}",
+                is_fixable=False,
+                severity=ir.IssueSeverity.WARNING,
+                translation_key="string_underperforming",
+                translation_placeholders={
+                    "mppt": f"MPPT{index + 1}",
+                    "serial": str(goods_id),
+                    "score": f"{self.string_analyzer.score(index):.0f}",
+                },
+            )
+        self._string_issues = set(underperforming)
+
+    def _sunrise(self, now: float) -> float | None:
+        """Return the timestamp of the next sunrise, recalculated once it has passed."""
+        if self._next_sunrise is None or self._next_sunrise <= now:
+            try:
+                self._next_sunrise = get_astral_event_next(
+                    self.hass, SUN_EVENT_SUNRISE
+                ).timestamp()
+            except ValueError:
+                # No sunrise at this location today (polar day/night)
+                self._next_sunrise = None
+        return self._next_sunrise
+
 
 class CloudInverterSensor(CoordinatorEntity, SensorEntity):
     """Representation of a Cloud Inverter sensor."""
@@ -259,6 +634,26 @@ class CloudInverterSensor(CoordinatorEntity, SensorEntity):
         self._attr_native_unit_of_measurement = unit
         self._attr_device_class = device_class
         self._attr_state_class = state_class
+        self._written: tuple[bool, Any] | None = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the new state unless it moved less than the configured deadband."""
+        written = (self.available, self.native_value)
+        deadband = self.coordinator.deadbands.get(self._attr_device_class)
+        if deadband and self._written is not None and written[0] == self._written[0]:
+            value, last = written[1], self._written[1]
+            if self._attr_native_unit_of_measurement == UnitOfPower.KILO_WATT:
+                # Power deadbands are configured in W
+                deadband /= 1000
+            if (
+                isinstance(value, float)
+                and isinstance(last, float)
+                and abs(value - last) < deadband
+            ):
+                return
+        self._written = written
+        super()._handle_coordinator_update()
 
     @property
     def native_value(self):
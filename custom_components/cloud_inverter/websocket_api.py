@@ -0,0 +1,129 @@
+"""WebSocket API for streaming Cloud Inverter snapshots to the frontend."""
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import CONF_GOODS_ID, DOMAIN, SIGNAL_COORDINATOR_READY
+from .export import typed_fields
+
+DATA_WEBSOCKET_REGISTERED = f"{DOMAIN}_websocket_registered"
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant) -> None:
+    """Register the WebSocket commands once."""
+    if hass.data.get(DATA_WEBSOCKET_REGISTERED):
+        return
+    hass.data[DATA_WEBSOCKET_REGISTERED] = True
+    websocket_api.async_register_command(hass, websocket_subscribe)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe",
+        vol.Optional(CONF_GOODS_ID): str,
+        vol.Optional("fields"): [str],
+        vol.Optional("changed_only", default=True): bool,
+    }
+)
+@callback
+def websocket_subscribe(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Stream coordinator snapshots to the client.
+
+    The first message of every inverter carries all fields; later ones only
+    the fields that changed, unless changed_only is false. This bypasses the
+    state machine and recorder, so it also works for disabled entities. When
+    an entry is reloaded, the stream follows its new coordinator.
+    """
+    goods_id = msg.get(CONF_GOODS_ID)
+    fields = set(msg["fields"]) if "fields" in msg else None
+    changed_only = msg["changed_only"]
+
+    entries = [
+        entry_id
+        for entry_id, entry_data in hass.data.get(DOMAIN, {}).items()
+        if "coordinator" in entry_data
+        and (goods_id is None or entry_data["goods_id"] == goods_id)
+    ]
+    if not entries:
+        connection.send_error(msg["id"], "not_found", "No matching Cloud Inverter found")
+        return
+
+    # Listener removal per entry, replaced when the entry sets up a new coordinator
+    unsubscribers: dict[str, Callable[[], None]] = {}
+
+    @callback
+    def _async_follow(entry_id: str) -> None:
+        entry_data = hass.data.get(DOMAIN, {}).get(entry_id)
+        if entry_data is None or "coordinator" not in entry_data:
+            return
+        if goods_id is not None and entry_data["goods_id"] != goods_id:
+            return
+        if unsubscribe := unsubscribers.pop(entry_id, None):
+            unsubscribe()
+
+        coordinator = entry_data["coordinator"]
+        last_sent: dict[str, Any] = {}
+
+        @callback
+        def _async_send() -> None:
+            if not coordinator.data:
+                return
+            snapshot = typed_fields(coordinator.data)
+            if fields is not None:
+                snapshot = {key: value for key, value in snapshot.items() if key in fields}
+            if changed_only and last_sent:
+                changes: dict[str, Any] = {
+                    key: value
+                    for key, value in snapshot.items()
+                    if last_sent.get(key) != value
+                }
+            else:
+                changes = dict(snapshot)
+            # Fields that became unknown are sent as null once
+            for key in last_sent.keys() - snapshot.keys():
+                changes[key] = None
+                del last_sent[key]
+            last_sent.update(snapshot)
+            if not changes:
+                return
+            connection.send_message(
+                websocket_api.event_message(
+                    msg["id"],
+                    {
+                        "goods_id": coordinator.statistics.goods_id,
+                        "t": round(time.time(), 1),
+                        "d": changes,
+                    },
+                )
+            )
+
+        unsubscribers[entry_id] = coordinator.async_add_listener(_async_send)
+        # Start every stream with the current snapshot
+        _async_send()
+
+    unsubscribe_ready = async_dispatcher_connect(hass, SIGNAL_COORDINATOR_READY, _async_follow)
+
+    @callback
+    def _async_unsubscribe() -> None:
+        unsubscribe_ready()
+        for unsubscribe in unsubscribers.values():
+            unsubscribe()
+
+    connection.subscriptions[msg["id"]] = _async_unsubscribe
+    connection.send_result(msg["id"])
+
+    for entry_id in entries:
+        _async_follow(entry_id)